@@ -17,9 +17,13 @@ from dotenv import load_dotenv
 from summarizer import TextSummarizer
 from voice_transcriber import VoiceTranscriber
 from mind_map_generator import MindMapGenerator
+from rate_limit_store import TimestampTable
+import user_state
+from user_state import user_states, set_user_state, get_user_state, clear_user_state
 import requests
 import traceback
 from collections import defaultdict
+from functools import lru_cache
 from typing import List, Dict, Optional
 
 # Создаем директорию для логов если её нет
@@ -85,7 +89,11 @@ else:
     MIND_MAP_AVAILABLE = False
     logger.warning("⚠️ Mind Map Generator недоступен - отсутствует OPENROUTER_API_KEY")
 
-YOUTUBE_REGEX = r"(?:v=|youtu\.be/|youtube\.com/embed/|youtube\.com/watch\?v=)?([\w-]{11})"
+# ID видео — ровно 11 символов [0-9A-Za-z_-] после "/", "v=", "vi=" или "%3D"
+# (attribution_link), либо в начале строки; справа ID ограничен разделителем
+YOUTUBE_REGEX = r"(?:^|/|%3D|v=|vi=)([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])"
+_VIDEO_ID_RE = re.compile(YOUTUBE_REGEX)
+_VIDEO_ID_CHARS_RE = re.compile(r"[0-9A-Za-z_-]{11}")
 
 def format_transcription_text(text: str) -> str:
     """
@@ -299,12 +307,16 @@ def log_and_notify_error(error: Exception, context: str = "", user_id: int = Non
 
 # Enhanced rate limiting constants
 MIN_REQUEST_INTERVAL = 15  # Increased from 10 to 15 seconds
+GLOBAL_MIN_REQUEST_INTERVAL = 2  # Minimum seconds between any requests
 MAX_RETRIES = 3
 BASE_DELAY = 2  # Base delay in seconds
 MAX_DELAY = 60  # Maximum delay in seconds
 
+# Часы rate limiter'а; тесты подменяют их, чтобы "перемотать" окно без sleep
+_now = time.time
+
 # Global rate limiting state
-request_timestamps = {}  # Track last request time per user
+request_timestamps = TimestampTable()  # Track last request time per user (fixed-size table)
 global_last_request = 0  # Global rate limiting
 
 # Voice message series grouping system
@@ -328,7 +340,7 @@ new_users = set()  # Simple set to track new users
 
 # User state tracking system (НОВАЯ ФУНКЦИЯ)
 # Отслеживаем состояние пользователя для правильной обработки сообщений
-user_states = {}  # Track user states: 'expecting_mind_map_text', 'normal', etc.
+# Хранилище и функции состояний - в модуле user_state (без зависимостей от Telegram)
 
 START_MESSAGE = (
     '👋 **Привет! Я YouTube Subtitle Bot**\n\n'
@@ -479,7 +491,10 @@ QUICK_HELP_MESSAGE = (
 
 # --- Вспомогательные функции ---
 def extract_video_id(text):
-    match = re.search(YOUTUBE_REGEX, text)
+    # Быстрый путь: пользователь прислал голый ID видео
+    if len(text) == 11 and _VIDEO_ID_CHARS_RE.fullmatch(text):
+        return text
+    match = _VIDEO_ID_RE.search(text)
     return match.group(1) if match else None
 
 def sanitize_filename(filename):
@@ -552,7 +567,7 @@ async def create_filename(video_id: str, file_type: str, lang_code: str = None,
 
 async def rate_limit_check(user_id: int) -> bool:
     """Check if user is within rate limits"""
-    now = time.time()
+    now = _now()
     last_time = request_timestamps.get(user_id, 0)
     
     if now - last_time < MIN_REQUEST_INTERVAL:
@@ -630,10 +645,10 @@ async def check_multiple_messages(user_id: int, message_type: str, content: str
 async def global_rate_limit_check() -> bool:
     """Check global rate limiting to prevent API abuse"""
     global global_last_request
-    now = time.time()
+    now = _now()
     
     async with global_request_lock:
-        if now - global_last_request < 2:  # Minimum 2 seconds between any requests
+        if now - global_last_request < GLOBAL_MIN_REQUEST_INTERVAL:
             return False
         global_last_request = now
         return True
@@ -1102,13 +1117,19 @@ async def get_available_transcripts_with_retry(video_id: str, max_retries: int =
     return None, False, "Неизвестная ошибка при получении списка субтитров."
 
 def build_language_keyboard(list_transcripts):
+    languages = tuple((t.language_code, t.language) for t in list_transcripts)
+    return _build_language_keyboard(languages)
+
+# Клавиатуры неизменяемы (InlineKeyboardMarkup заморожен), поэтому одинаковые
+# наборы кнопок строим один раз и переиспользуем между запросами
+@lru_cache(maxsize=128)
+def _build_language_keyboard(languages):
     buttons = []
-    for transcript in list_transcripts:
-        lang_code = transcript.language_code
-        lang_name = transcript.language
+    for lang_code, lang_name in languages:
         buttons.append([InlineKeyboardButton(f'{lang_name} ({lang_code})', callback_data=f'lang_{lang_code}')])
     return InlineKeyboardMarkup(buttons)
 
+@lru_cache(maxsize=1)
 def build_action_keyboard():
     """Выбор действия: только субтитры или с ИИ-суммаризацией"""
     return InlineKeyboardMarkup([
@@ -1117,6 +1138,7 @@ def build_action_keyboard():
         [InlineKeyboardButton('🔮 Только ИИ-суммаризация', callback_data='action_only_summary')]
     ])
 
+@lru_cache(maxsize=1)
 def build_format_keyboard():
     return InlineKeyboardMarkup([
         [InlineKeyboardButton('С временными метками', callback_data='format_with_time')],
@@ -1145,13 +1167,41 @@ def build_main_keyboard():
     
     return InlineKeyboardMarkup(buttons)
 
-def format_subtitles(transcript, with_time=False):
-    if with_time:
-        return '\n'.join([
-            f"[{int(item.start)//60:02}:{int(item.start)%60:02}] {item.text}" for item in transcript
-        ])
-    else:
+def format_subtitles(transcript, with_time=False, max_chars=None):
+    if max_chars is not None:
+        # Нужен только префикс: строки форматируются, пока не наберётся max_chars
+        lines = []
+        length = 0
+        for item in transcript:
+            if with_time:
+                minutes, seconds = divmod(int(item.start), 60)
+                line = f"[{minutes:02}:{seconds:02}] {item.text}"
+            else:
+                line = item.text
+            lines.append(line)
+            length += len(line) + 1
+            if length > max_chars:
+                break
+        return '\n'.join(lines)[:max_chars]
+    if not with_time:
         return '\n'.join([item.text for item in transcript])
+    lines = []
+    for item in transcript:
+        # Один int() и divmod на строку вместо двух int() с // и %
+        minutes, seconds = divmod(int(item.start), 60)
+        lines.append(f"[{minutes:02}:{seconds:02}] {item.text}")
+    return '\n'.join(lines)
+
+def format_subtitles_both(transcript):
+    """Субтитры без меток и с временными метками за один проход по транскрипту"""
+    plain_parts = []
+    timed_parts = []
+    for item in transcript:
+        text = item.text
+        minutes, seconds = divmod(int(item.start), 60)
+        plain_parts.append(text)
+        timed_parts.append(f"[{minutes:02}:{seconds:02}] {text}")
+    return '\n'.join(plain_parts), '\n'.join(timed_parts)
 
 # --- Хендлеры ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -3124,47 +3174,9 @@ async def start_background_tasks():
             logger.error(f"❌ Ошибка в фоновой задаче очистки: {e}")
             await asyncio.sleep(60)  # При ошибке ждем 1 минуту
 
-async def set_user_state(user_id: int, state: str):
-    """Устанавливает состояние пользователя"""
-    global user_states
-    user_states[user_id] = state
-    logger.info(f"🔄 Пользователь {user_id} переведен в состояние: {state}")
-
-async def get_user_state(user_id: int) -> str:
-    """Получает текущее состояние пользователя"""
-    global user_states
-    return user_states.get(user_id, 'normal')
-
-async def clear_user_state(user_id: int):
-    """Очищает состояние пользователя"""
-    global user_states
-    if user_id in user_states:
-        del user_states[user_id]
-        logger.info(f"🔄 Состояние пользователя {user_id} очищено")
-
 async def cleanup_expired_user_states():
-    """Очищает устаревшие состояния пользователей"""
-    global user_states
-    
-    now = time.time()
-    cleanup_threshold = 3600  # 1 час
-    
-    # Очищаем состояния пользователей, которые неактивны более часа
-    # Для простых состояний (строки) используем время последнего сообщения
-    expired_users = []
-    
-    for user_id, state in user_states.items():
-        # Если состояние - строка, проверяем время последнего сообщения
-        if isinstance(state, str):
-            last_message_time = last_text_message_time.get(user_id, 0)
-            if now - last_message_time > cleanup_threshold:
-                expired_users.append(user_id)
-    
-    for user_id in expired_users:
-        del user_states[user_id]
-    
-    if expired_users:
-        logger.info(f"🧹 Очищено {len(expired_users)} устаревших состояний пользователей")
+    """Очищает устаревшие состояния пользователей (активность - текстовые сообщения)"""
+    await user_state.cleanup_expired_user_states(last_text_message_time)
 
 if __name__ == '__main__':
     try:
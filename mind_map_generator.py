@@ -12,6 +12,7 @@ Mind Map Generator для Subs-bot
 5. Генерация интерактивных HTML карт
 """
 
+import os
 import json
 import asyncio
 import logging
@@ -392,8 +393,10 @@ class MindMapGenerator:
                     if response.status == 200:
                         content = await response.read()
                         
-                        # Создаем директорию если не существует
-                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                        # Создаем директорию если не существует (путь может быть без директории)
+                        output_dir = os.path.dirname(output_path)
+                        if output_dir:
+                            os.makedirs(output_dir, exist_ok=True)
                         
                         # Сохраняем PNG
                         with open(output_path, 'wb') as f:
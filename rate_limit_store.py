@@ -0,0 +1,77 @@
+"""
+Компактное хранилище времени последних запросов для rate limiting
+"""
+
+from array import array
+
+
+class TimestampTable:
+    """Время последнего запроса по user_id в хеш-таблице на плоских массивах.
+
+    Вместо dict - массивы ключей int64 и отметок float64 плюс байт занятости
+    на слот: 17 байт на слот, память выделяется заранее и не растёт с каждым
+    новым пользователем. Открытая адресация с линейным пробированием в окне
+    PROBE слотов. Занятость хранится отдельно от отметок, а записи не
+    удаляются (только clear()), поэтому цепочки пробирования не рвутся.
+    Если окно ключа заполнено, таблица удваивается: записи не вытесняются,
+    и лимит активного пользователя не сбрасывается.
+    """
+
+    PROBE = 8
+
+    def __init__(self, bits: int = 16):
+        self._alloc(bits)
+
+    def _alloc(self, bits: int):
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._keys = array('q', bytes(8 << bits))
+        self._stamps = array('d', bytes(8 << bits))
+        self._used = bytearray(1 << bits)
+
+    def _slot(self, user_id: int) -> int:
+        # Фибоначчиево хеширование: старшие биты произведения на 2^64/φ
+        return ((user_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+
+    def get(self, user_id: int, default: float = 0) -> float:
+        """Отметка пользователя или default, если её нет"""
+        slot = self._slot(user_id)
+        for i in range(self.PROBE):
+            j = (slot + i) & self._mask
+            if not self._used[j]:
+                # Ключи занимают первый свободный слот окна: дальше искать нечего
+                break
+            if self._keys[j] == user_id:
+                return self._stamps[j]
+        return default
+
+    def __setitem__(self, user_id: int, timestamp: float):
+        if not timestamp > 0:
+            raise ValueError(f"Отметка времени должна быть положительной: {timestamp}")
+        while not self._insert(user_id, timestamp):
+            self._grow()
+
+    def _insert(self, user_id: int, timestamp: float) -> bool:
+        """Записывает отметку; False, если окно ключа заполнено другими ключами"""
+        slot = self._slot(user_id)
+        for i in range(self.PROBE):
+            j = (slot + i) & self._mask
+            if not self._used[j] or self._keys[j] == user_id:
+                self._used[j] = 1
+                self._keys[j] = user_id
+                self._stamps[j] = timestamp
+                return True
+        return False
+
+    def _grow(self):
+        """Удваивает таблицу и переносит все записи"""
+        keys, stamps, used = self._keys, self._stamps, self._used
+        self._alloc(self._bits + 1)
+        for j, occupied in enumerate(used):
+            if occupied:
+                while not self._insert(keys[j], stamps[j]):
+                    self._grow()
+
+    def clear(self):
+        """Удаляет все отметки"""
+        self._alloc(self._bits)
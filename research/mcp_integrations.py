@@ -24,30 +24,77 @@ class MCPResponse:
     server: str = ""
     response_time: float = 0.0
 
+class _HttpPool:
+    """Общий пул HTTP-соединений для MCP клиентов.
+    
+    Открывается MCPIntegrationManager (с подсчётом ссылок для вложенных
+    менеджеров); пока пул открыт, клиенты используют его сессию вместо
+    создания собственной на каждый async with.
+    """
+    session: Optional[aiohttp.ClientSession] = None
+    users: int = 0
+    
+    @classmethod
+    async def acquire(cls) -> aiohttp.ClientSession:
+        if cls.session is None or cls.session.closed:
+            # Таймаут сессии - запасной: клиенты передают свой в каждый запрос
+            cls.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        cls.users += 1
+        return cls.session
+    
+    @classmethod
+    async def release(cls):
+        cls.users -= 1
+        if cls.users <= 0 and cls.session is not None:
+            await cls.session.close()
+            cls.session = None
+            cls.users = 0
+
 class MCPClient:
     """Базовый клиент для MCP серверов"""
     
     def __init__(self, server_name: str, timeout: int = 30):
         self.server_name = server_name
         self.timeout = timeout
+        self.request_timeout = aiohttp.ClientTimeout(total=timeout)
         self.session = None
+        self._owns_session = False
+        # Экземпляр клиента общий для параллельных операций менеджера:
+        # async with занимает его целиком, иначе выход одной операции
+        # закроет или обнулит сессию под другой
+        self._lock = asyncio.Lock()
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        await self._lock.acquire()
+        if _HttpPool.session is not None and not _HttpPool.session.closed:
+            # У общей сессии свой таймаут: клиентский передаётся в _make_request
+            self.session = _HttpPool.session
+            self._owns_session = False
+        else:
+            self.session = aiohttp.ClientSession(timeout=self.request_timeout)
+            self._owns_session = True
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        try:
+            if self.session and self._owns_session:
+                await self.session.close()
+        finally:
+            self.session = None
+            self._lock.release()
     
     async def _make_request(self, method: str, endpoint: str, data: Dict = None) -> MCPResponse:
         """Выполнение запроса к MCP серверу"""
         start_time = asyncio.get_event_loop().time()
         
         try:
-            # Здесь будет реальная интеграция с MCP API
-            # Пока используем имитацию
-            await asyncio.sleep(0.1)  # Имитация сетевой задержки
+            # Здесь будет реальная интеграция с MCP API:
+            # self.session.request(method, url, json=data, timeout=self.request_timeout)
+            # Пока используем имитацию, ограниченную тем же таймаутом клиента
+            await asyncio.wait_for(asyncio.sleep(0.1), self.timeout)  # Имитация сетевой задержки
             
             response_time = asyncio.get_event_loop().time() - start_time
             
@@ -61,10 +108,12 @@ class MCPClient:
             
         except Exception as e:
             response_time = asyncio.get_event_loop().time() - start_time
-            logger.error(f"Error in {self.server_name}: {e}")
+            # TimeoutError без текста: подставляем таймаут клиента
+            error = str(e) or f"{type(e).__name__} after {self.timeout}s"
+            logger.error(f"Error in {self.server_name}: {error}")
             return MCPResponse(
                 success=False,
-                error=str(e),
+                error=error,
                 server=self.server_name,
                 response_time=response_time
             )
@@ -451,6 +500,14 @@ class MCPIntegrationManager:
             "backup": BackupIntegration()
         }
     
+    async def __aenter__(self):
+        """Открывает общий пул соединений для всех интеграций"""
+        await _HttpPool.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await _HttpPool.release()
+    
     async def create_task_integrated(self, task_data: TaskData) -> Dict[str, MCPResponse]:
         """Создание задачи во всех интегрированных серверах"""
         results = {}
@@ -508,21 +565,61 @@ class MCPIntegrationManager:
         
         return results
     
+    async def _check_server(self, server_name: str, integration: MCPClient) -> bool:
+        """Проверка доступности одного сервера"""
+        try:
+            async with integration as client:
+                # Простая проверка доступности
+                test_response = await client._make_request("GET", "/health")
+                return test_response.success
+        except Exception as e:
+            logger.error(f"Error checking {server_name}: {e}")
+            return False
+    
     async def get_integration_status(self) -> Dict[str, bool]:
         """Получение статуса всех интеграций"""
-        status = {}
-        
-        for server_name, integration in self.integrations.items():
-            try:
-                async with integration as client:
-                    # Простая проверка доступности
-                    test_response = await client._make_request("GET", "/health")
-                    status[server_name] = test_response.success
-            except Exception as e:
-                logger.error(f"Error checking {server_name}: {e}")
-                status[server_name] = False
-        
-        return status
+        # Опрашиваем все серверы параллельно
+        results = await asyncio.gather(*(
+            self._check_server(server_name, integration)
+            for server_name, integration in self.integrations.items()
+        ))
+        
+        return dict(zip(self.integrations, results))
+    
+    async def _dispatch(self, op: Dict[str, Any]) -> Any:
+        """Выполнение одной операции из пакета batch_execute"""
+        name = op.get("op")
+        if name == "status":
+            return await self.get_integration_status()
+        if name == "create_task":
+            return await self.create_task_integrated(op["task"])
+        raise ValueError(f"Unknown batch operation: {name}")
+    
+    async def batch_execute(self, ops: List[Dict[str, Any]], max_concurrent: int = 8,
+                            stop_on_error: bool = False) -> List[Any]:
+        """Пакетное выполнение операций: один вызов вместо N последовательных.
+        
+        Операции выполняются параллельно, не более max_concurrent одновременно;
+        операции, обращающиеся к одной интеграции, входят в её клиент по очереди.
+        Результаты возвращаются в порядке ops; при stop_on_error=False ошибка
+        операции попадает в список как объект исключения, при stop_on_error=True
+        первая ошибка отменяет оставшиеся операции и пробрасывается.
+        """
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def run(op: Dict[str, Any]) -> Any:
+            async with semaphore:
+                return await self._dispatch(op)
+        
+        if not stop_on_error:
+            return await asyncio.gather(*(run(op) for op in ops), return_exceptions=True)
+        
+        tasks = [asyncio.create_task(run(op)) for op in ops]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
 
 # Экспорт для использования в оркестраторе
 __all__ = [
@@ -5,11 +5,29 @@ import time
 import asyncio
 import random
 import logging
+from functools import lru_cache
 from typing import List, Optional, Tuple, Dict
 from dotenv import load_dotenv
 
+try:
+    import fasttext  # Опционально: точное определение языка моделью lid.176.ftz
+except ImportError:
+    fasttext = None
+
 load_dotenv()
 
+# Путь к модели FastText для определения языка
+LID_MODEL_PATH = os.getenv('LID_MODEL_PATH', 'models/lid.176.ftz')
+
+# Регулярные выражения для эвристического определения языка
+LETTER_RE = re.compile(r'[^\W\d_]')
+RUSSIAN_CHARS_RE = re.compile(r'[а-яё]')
+ENGLISH_CHARS_RE = re.compile(r'[a-z]')
+# Слова и переводы строк, на которые split_text/count_chunks делят текст
+SPLIT_TOKEN_RE = re.compile(r'\S+|\n')
+RUSSIAN_RATIO_THRESHOLD = 0.3  # Доля русских символов, начиная с которой текст считается русским
+ENGLISH_RATIO_THRESHOLD = 0.5  # Доля английских символов, начиная с которой текст считается английским
+
 # Настройка логгера для суммаризации
 summarization_logger = logging.getLogger('summarization')
 summarization_logger.setLevel(logging.INFO)
@@ -26,8 +44,18 @@ if not summarization_logger.handlers:
 class TextSummarizer:
     """Класс для суммаризации текста через OpenRouter API с автоматическим выбором модели"""
     
-    def __init__(self):
+    # Модель определения языка загружается один раз на процесс
+    _lid_model = None
+    _lid_model_loaded = False
+    
+    def __init__(self, http_session: Optional[requests.Session] = None):
+        """
+        Args:
+            http_session: Общая HTTP-сессия для запросов к OpenRouter (keep-alive);
+                по умолчанию каждый запрос открывает новое соединение
+        """
         self.api_key = os.getenv('OPENROUTER_API_KEY')
+        self.http_session = http_session
         self.chunk_size = 1000
         self.max_retries = 3
         self.retry_delay = 5
@@ -52,6 +80,8 @@ class TextSummarizer:
         
         # История использованных моделей для текущей сессии
         self.used_models = set()
+        # Случайный порядок моделей для текущего круга ротации
+        self._model_order = iter(())
         
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -74,7 +104,7 @@ class TextSummarizer:
         
         result = {
             "length": text_length,
-            "chunks": len(self.split_text(text)),
+            "chunks": self.count_chunks(text),
             "status": "ok",
             "warning": None,
             "can_process": True
@@ -95,15 +125,13 @@ class TextSummarizer:
     
     def get_available_model_index(self) -> int:
         """Возвращает индекс доступной модели, избегая уже использованных"""
-        available_models = [i for i in range(len(self.models)) if i not in self.used_models]
-        
-        if not available_models:
-            # Если все модели использованы, сбрасываем историю
+        if not self.used_models or len(self.used_models) >= len(self.models):
+            # Если все модели использованы (или история сброшена), начинаем новый круг
             self.used_models.clear()
-            available_models = list(range(len(self.models)))
+            self._model_order = iter(random.sample(range(len(self.models)), len(self.models)))
         
-        # Выбираем случайную доступную модель
-        selected_index = random.choice(available_models)
+        # Берем следующую модель из перемешанного порядка текущего круга
+        selected_index = next(self._model_order)
         self.used_models.add(selected_index)
         
         summarization_logger.info(f"🎯 Выбрана модель: {self.models[selected_index][0]} (индекс: {selected_index})")
@@ -143,30 +171,81 @@ class TextSummarizer:
             f"{feedback_text}"
         )
     
+    @classmethod
+    def _get_lid_model(cls):
+        """Лениво загружает модель FastText (None, если fasttext или файл модели недоступны)"""
+        if not cls._lid_model_loaded:
+            cls._lid_model_loaded = True
+            if fasttext is not None and os.path.exists(LID_MODEL_PATH):
+                try:
+                    cls._lid_model = fasttext.load_model(LID_MODEL_PATH)
+                    summarization_logger.info(f"🌍 Загружена модель определения языка: {LID_MODEL_PATH}")
+                except Exception as e:
+                    summarization_logger.warning(f"⚠️ Не удалось загрузить модель {LID_MODEL_PATH}: {e}")
+        return cls._lid_model
+    
+    @staticmethod
+    def _lid_label_to_lang(label: str) -> str:
+        """Преобразует метку FastText ('__label__ru') в код языка"""
+        lang = label.replace('__label__', '')
+        return lang if lang in ('ru', 'en') else 'other'
+    
     def detect_language(self, text: str) -> str:
         """
-        Определяет язык текста на основе простых эвристик
+        Определяет язык текста моделью FastText, а при её отсутствии - по простым эвристикам
         Returns: код языка ('ru', 'en', 'other')
         """
+        return self._detect_language_cached(text)
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _detect_language_cached(text: str) -> str:
+        """Определение языка с кэшированием результата для повторяющихся текстов"""
+        # Текст без букв (пустой, только цифры) не имеет языка
+        if not LETTER_RE.search(text):
+            return 'other'
+        
+        lid_model = TextSummarizer._get_lid_model()
+        if lid_model is not None:
+            labels, _ = lid_model.predict(text.replace('\n', ' '), k=1)
+            return TextSummarizer._lid_label_to_lang(labels[0])
+        
         # Простые эвристики для определения языка
         text_lower = text.lower()
+        total_chars = len(text_lower) - text_lower.count(' ')
         
         # Русский язык
-        russian_chars = re.findall(r'[а-яё]', text_lower)
-        russian_ratio = len(russian_chars) / len(text_lower.replace(' ', '')) if text_lower.replace(' ', '') else 0
+        russian_ratio = len(RUSSIAN_CHARS_RE.findall(text_lower)) / total_chars
         
         # Английский язык
-        english_chars = re.findall(r'[a-z]', text_lower)
-        english_ratio = len(english_chars) / len(text_lower.replace(' ', '')) if text_lower.replace(' ', '') else 0
+        english_ratio = len(ENGLISH_CHARS_RE.findall(text_lower)) / total_chars
         
         # Определяем язык по преобладанию символов
-        if russian_ratio > 0.3:  # Если больше 30% русских символов
+        if russian_ratio > RUSSIAN_RATIO_THRESHOLD:
             return 'ru'
-        elif english_ratio > 0.5:  # Если больше 50% английских символов
+        elif english_ratio > ENGLISH_RATIO_THRESHOLD:
             return 'en'
         else:
             return 'other'
     
+    def detect_languages(self, texts: List[str]) -> List[str]:
+        """
+        Определяет языки нескольких текстов одним пакетным вызовом модели FastText
+        Returns: список кодов языков ('ru', 'en', 'other') в порядке текстов
+        """
+        lid_model = self._get_lid_model()
+        if lid_model is None:
+            return [self.detect_language(text) for text in texts]
+        
+        results = ['other'] * len(texts)
+        # Тексты без букв в модель не передаем
+        indices = [i for i, text in enumerate(texts) if LETTER_RE.search(text)]
+        if indices:
+            labels, _ = lid_model.predict([texts[i].replace('\n', ' ') for i in indices], k=1)
+            for i, text_labels in zip(indices, labels):
+                results[i] = self._lid_label_to_lang(text_labels[0])
+        return results
+    
     async def translate_to_russian(self, text: str, source_lang: str = None) -> str:
         """
         Переводит текст на русский язык с автоматическим выбором модели
@@ -237,7 +316,7 @@ class TextSummarizer:
     def split_text(self, text: str, max_len: int = None) -> List[str]:
         """Разбивает текст на части, не разрывая слова"""
         max_len = max_len or self.chunk_size
-        words = re.findall(r'\S+|\n', text)
+        words = SPLIT_TOKEN_RE.findall(text)
         chunks = []
         current = ''
         
@@ -254,6 +333,40 @@ class TextSummarizer:
         
         return chunks
     
+    def count_chunks(self, text: str, max_len: int = None) -> int:
+        """Число частей split_text без построения самих частей.
+        
+        Повторяет правила split_text, но отслеживает только длину текущей
+        части - строки не склеиваются и список не создаётся.
+        """
+        max_len = max_len or self.chunk_size
+        count = 0
+        current_len = 0
+        ends_with_newline = False
+        has_words = False  # current.strip() непустой
+        
+        for word in SPLIT_TOKEN_RE.findall(text):
+            word_len = len(word)
+            is_newline = word == '\n'
+            
+            if current_len + word_len + 1 > max_len:
+                if has_words:
+                    count += 1
+                current_len = 0 if is_newline else word_len
+                ends_with_newline = False
+                has_words = not is_newline
+            else:
+                if current_len and not is_newline and not ends_with_newline:
+                    current_len += 1
+                current_len += word_len
+                ends_with_newline = is_newline
+                has_words = has_words or not is_newline
+        
+        if has_words:
+            count += 1
+        
+        return count
+    
     async def _make_request(self, model_id: str, messages: List[dict]) -> Optional[str]:
         """Делает запрос к OpenRouter API с повторными попытками"""
         data = {
@@ -264,10 +377,11 @@ class TextSummarizer:
         for attempt in range(1, self.max_retries + 1):
             try:
                 # Делаем синхронный запрос в отдельном потоке
+                post = self.http_session.post if self.http_session is not None else requests.post
                 loop = asyncio.get_event_loop()
                 response = await loop.run_in_executor(
                     None,
-                    lambda: requests.post(
+                    lambda: post(
                         "https://openrouter.ai/api/v1/chat/completions",
                         headers=self.headers,
                         json=data,
@@ -0,0 +1,47 @@
+"""
+Общий event loop для ручного запуска тестовых скриптов
+"""
+
+import asyncio
+import threading
+
+
+class AsyncLoopThread:
+    """Event loop в фоновом потоке, общий для всех корутин процесса.
+
+    В отличие от asyncio.run() цикл создаётся один раз, поэтому клиентские
+    сессии и пулы соединений остаются "тёплыми" между вызовами run().
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="async-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @classmethod
+    def get(cls) -> "AsyncLoopThread":
+        """Единственный экземпляр на процесс"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def run(self, coro):
+        """Выполняет корутину в общем цикле и возвращает её результат"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        """Останавливает цикл и поток"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        with self._lock:
+            if AsyncLoopThread._instance is self:
+                AsyncLoopThread._instance = None
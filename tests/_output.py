@@ -0,0 +1,39 @@
+"""
+Буферизованный вывод для тестовых скриптов
+"""
+
+import functools
+import inspect
+import io
+import sys
+from contextlib import contextmanager, redirect_stdout
+
+
+@contextmanager
+def buffered_stdout():
+    """Собирает print() в StringIO и выводит всё одной записью в конце,
+    даже если блок завершился исключением"""
+    stdout = sys.stdout
+    buf = io.StringIO()
+    try:
+        with redirect_stdout(buf):
+            yield buf
+    finally:
+        stdout.write(buf.getvalue())
+        stdout.flush()
+
+
+def buffered_output(func):
+    """Декоратор: весь вывод функции (синхронной или корутины) одной записью"""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with buffered_stdout():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with buffered_stdout():
+            return func(*args, **kwargs)
+    return wrapper
@@ -1,8 +1,18 @@
 import pytest
 import asyncio
 import os
+import time
 from unittest.mock import patch, MagicMock
 
+# uvloop (опционально, только не-Windows): более быстрый event loop для асинхронных тестов
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 
 def pytest_configure(config):
     """Конфигурация pytest"""
@@ -36,12 +46,13 @@ def pytest_addoption(parser):
     )
 
 
-@pytest.fixture(scope="session")
-def event_loop():
-    """Создаем event loop для всех асинхронных тестов"""
-    loop = asyncio.new_event_loop()
-    yield loop
-    loop.close()
+@pytest.fixture
+def no_sleep(monkeypatch):
+    """asyncio.sleep и time.sleep не ждут реального времени (паузы и backoff в тестах)"""
+    async def sleep(*args, **kwargs):
+        return None
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    monkeypatch.setattr(time, "sleep", lambda *args, **kwargs: None)
 
 
 @pytest.fixture
@@ -127,6 +138,23 @@ def mock_telegram_objects():
     }
 
 
+@pytest.fixture(scope="session")
+async def orchestrator():
+    """Один EnterpriseTaskOrchestrator на сессию: конфиг, логгер и
+    circuit breakers инициализируются один раз"""
+    module = pytest.importorskip("enterprise_task_orchestrator")
+    instance = module.EnterpriseTaskOrchestrator()
+    yield instance
+    await instance.stop()
+
+
+@pytest.fixture(scope="session")
+def integration_manager():
+    """Один MCPIntegrationManager на сессию"""
+    module = pytest.importorskip("mcp_integrations")
+    return module.MCPIntegrationManager()
+
+
 @pytest.fixture
 def mock_youtube_api():
     """Фикстура для мокирования YouTube API"""
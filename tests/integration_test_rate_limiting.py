@@ -35,21 +35,59 @@ TEST_VIDEO_IDS = [
 INTEGRATION_TEST_DELAY = 5  # Seconds between tests to avoid rate limits
 MAX_TEST_DURATION = 30  # Maximum seconds for any single test
 
+# Tests that hit the real YouTube API and must respect the quota
+REAL_API_TESTS = {
+    "test_real_youtube_video_transcript_retrieval",
+    "test_rate_limiting_with_real_api_calls",
+    "test_concurrent_request_handling",
+    "test_error_handling_scenarios",
+}
+
+# Token bucket for the YouTube quota: refilled at 1 request per INTEGRATION_TEST_DELAY seconds
+_api_bucket = {'tokens': 1.0, 'last': time.monotonic()}
+
+
+def acquire_api_token():
+    """Take a token from the API bucket, sleeping only if the bucket is empty"""
+    now = time.monotonic()
+    tokens = min(1.0, _api_bucket['tokens'] + (now - _api_bucket['last']) / INTEGRATION_TEST_DELAY)
+    if tokens < 1.0:
+        time.sleep((1.0 - tokens) * INTEGRATION_TEST_DELAY)
+        tokens = 1.0
+    _api_bucket['tokens'] = tokens - 1.0
+    _api_bucket['last'] = time.monotonic()
+
+
+async def next_success(tasks):
+    """Wait for tasks until the first one reports success; pending tasks are left to the caller"""
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is not None:
+                logger.warning(f"Request failed with exception: {task.exception()}")
+            elif task.result()[1]:  # success flag
+                return True
+            else:
+                logger.warning(f"Request failed: {task.result()[2]}")
+    return False
+
 
 class TestRateLimitingIntegration:
     """Integration tests for rate limiting functionality"""
     
-    def setup_method(self):
+    def setup_method(self, method):
         """Setup before each test"""
         # Clear rate limiting state
         bot.request_timestamps.clear()
         bot.global_last_request = 0
+        # Wait for API quota only when the test actually calls YouTube
+        if method.__name__ in REAL_API_TESTS:
+            acquire_api_token()
         logger.info(f"Starting integration test: {self.__class__.__name__}")
     
     def teardown_method(self):
         """Cleanup after each test"""
-        # Add delay to avoid rate limits
-        time.sleep(INTEGRATION_TEST_DELAY)
         logger.info(f"Completed integration test: {self.__class__.__name__}")
     
     @pytest.mark.asyncio
@@ -123,24 +161,33 @@ class TestRateLimitingIntegration:
         """Test exponential backoff behavior with controlled failures"""
         logger.info("Testing exponential backoff behavior")
         
-        # Mock the API to simulate rate limiting
-        with patch('bot.YouTubeTranscriptApi.get_transcript') as mock_get_transcript:
-            # Simulate rate limit errors
-            mock_get_transcript.side_effect = Exception("Too Many Requests")
-            
-            start_time = time.time()
+        # Record backoff delays instead of actually sleeping
+        sleeps = []
+        
+        # Mock the API instance to simulate rate limiting on every method
+        api = MagicMock()
+        api.fetch.side_effect = Exception("Too Many Requests")
+        api.list.side_effect = Exception("Too Many Requests")
+        
+        with patch('bot.YouTubeTranscriptApi', MagicMock(return_value=api)), \
+                patch('bot.global_rate_limit_check', AsyncMock(return_value=True)), \
+                patch('bot.asyncio.sleep', new=AsyncMock(side_effect=sleeps.append)):
             result, success, error = await bot.get_transcript_with_retry(
                 "test_video", ["en"], max_retries=3
             )
-            duration = time.time() - start_time
+            duration = sum(sleeps)
             
             # Should fail after retries
             assert success is False, "Should have failed after retries"
-            assert "Превышен лимит запросов" in error, f"Unexpected error: {error}"
+            assert result is None
+            # The fallback chain (fetch -> list -> auto fetch) wraps the 429 into
+            # "all methods failed", so the generic branch backs off without jitter
+            assert error.startswith("Ошибка при получении субтитров"), f"Unexpected error: {error}"
             
-            # Should have taken some time due to backoff delays
-            assert duration > 2, f"Backoff delays too short: {duration}s"
-            assert duration < 15, f"Backoff delays too long: {duration}s"
+            # One delay between attempts, doubling each time
+            assert sleeps == [bot.BASE_DELAY * 2 ** attempt for attempt in range(2)], sleeps
+            # Methods 1 and 3 call fetch on every attempt
+            assert api.fetch.call_count == 2 * 3
             
             logger.info(f"Exponential backoff test completed in {duration:.2f}s")
     
@@ -149,32 +196,28 @@ class TestRateLimitingIntegration:
         """Test handling of concurrent requests"""
         logger.info("Testing concurrent request handling")
         
-        # Create multiple concurrent requests
+        # Cap concurrency so that we don't provoke YouTube into 429 responses
+        semaphore = asyncio.Semaphore(2)
+        
         async def make_request(video_id):
-            return await bot.get_available_transcripts_with_retry(video_id)
+            async with semaphore:
+                return await bot.get_available_transcripts_with_retry(video_id)
         
-        # Start multiple requests concurrently
+        # Start multiple requests concurrently, stop at the first success
         start_time = time.time()
-        tasks = [make_request(video_id) for video_id in TEST_VIDEO_IDS]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [asyncio.create_task(make_request(video_id)) for video_id in TEST_VIDEO_IDS]
+        try:
+            succeeded = await next_success(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
         duration = time.time() - start_time
         
-        # Check results
-        success_count = 0
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.warning(f"Request {i} failed with exception: {result}")
-            elif result[1]:  # success flag
-                success_count += 1
-                logger.info(f"Request {i} succeeded")
-            else:
-                logger.warning(f"Request {i} failed: {result[2]}")
-        
-        # At least some requests should succeed
-        assert success_count > 0, "No requests succeeded"
+        # At least one request should succeed
+        assert succeeded, "No requests succeeded"
         assert duration < MAX_TEST_DURATION, f"Concurrent requests took too long: {duration}s"
         
-        logger.info(f"Concurrent requests completed: {success_count}/{len(results)} succeeded in {duration:.2f}s")
+        logger.info(f"Concurrent requests completed: first success in {duration:.2f}s")
     
     @pytest.mark.asyncio
     async def test_error_handling_scenarios(self):
@@ -200,19 +243,18 @@ class TestRateLimitingIntegration:
         
         # Test that global rate limit prevents too many requests
         async def test_global_limit():
-            # Make multiple rapid requests
-            results = []
+            # Make multiple rapid requests, bit i is set when request i passed
+            mask = 0
             for i in range(5):
-                result = await bot.global_rate_limit_check()
-                results.append(result)
+                mask |= int(await bot.global_rate_limit_check()) << i
                 await asyncio.sleep(0.1)  # Small delay
             
-            return results
+            return mask
         
-        results = await test_global_limit()
+        mask = await test_global_limit()
         
         # Only one request should succeed (the first one)
-        success_count = sum(results)
+        success_count = mask.bit_count()
         assert success_count == 1, f"Expected 1 successful request, got {success_count}"
         
         logger.info(f"Global rate limit test: {success_count}/5 requests succeeded")
@@ -256,8 +298,8 @@ class TestRateLimitingIntegration:
         result2 = await bot.rate_limit_check(user_id)
         assert result2 is False, "Second request should be blocked"
         
-        # Wait for rate limit to expire (simulate by clearing state)
-        bot.request_timestamps[user_id] = 0
+        # Wait for rate limit to expire (simulate by backdating the last request)
+        bot.request_timestamps[user_id] = bot._now() - bot.MIN_REQUEST_INTERVAL
         
         # Third request should succeed
         result3 = await bot.rate_limit_check(user_id)
@@ -269,23 +311,20 @@ class TestRateLimitingIntegration:
 class TestRateLimitingPerformance:
     """Performance tests for rate limiting functionality"""
     
-    @pytest.mark.asyncio
-    async def test_rate_limit_check_performance(self):
+    def test_rate_limit_check_performance(self, benchmark):
         """Test performance of rate limit checks"""
         logger.info("Testing rate limit check performance")
         
-        # Test multiple rapid rate limit checks
-        start_time = time.time()
-        
-        for i in range(100):
-            await bot.rate_limit_check(i)
-        
-        duration = time.time() - start_time
+        async def run_checks():
+            for i in range(100):
+                await bot.rate_limit_check(i)
         
-        # Should be very fast (less than 1 second for 100 checks)
-        assert duration < 1.0, f"Rate limit checks too slow: {duration}s for 100 checks"
+        # pytest-benchmark calibrates rounds and keeps baselines in .benchmarks/
+        benchmark(lambda: asyncio.run(run_checks()))
         
-        logger.info(f"Rate limit check performance: {duration:.3f}s for 100 checks")
+        # With --benchmark-disable or under xdist there are no stats
+        if benchmark.stats:
+            logger.info(f"Rate limit check performance: {benchmark.stats.stats.median:.6f}s median for 100 checks")
     
     @pytest.mark.asyncio
     async def test_memory_usage(self):
@@ -30,18 +30,19 @@ class SimpleTestRunner:
         self.tests_passed = 0
         self.tests_failed = 0
         self.failed_tests = []
+        self._buf = StringIO()  # Вывод копится здесь и печатается одним вызовом в summary()
     
     def test(self, name, test_func):
         """Запускает один тест"""
         self.tests_run += 1
-        print(f"🧪 Тест: {name}")
+        self._buf.write(f"🧪 Тест: {name}\n")
         
         try:
             test_func()
-            print("   ✅ ПРОЙДЕН")
+            self._buf.write("   ✅ ПРОЙДЕН\n")
             self.tests_passed += 1
         except Exception as e:
-            print(f"   ❌ ОШИБКА: {e}")
+            self._buf.write(f"   ❌ ОШИБКА: {e}\n")
             self.tests_failed += 1
             self.failed_tests.append(name)
     
@@ -67,18 +68,21 @@ class SimpleTestRunner:
     
     def summary(self):
         """Выводит итоги тестирования"""
-        print("\n" + "="*50)
-        print(f"📊 ИТОГИ ТЕСТИРОВАНИЯ:")
-        print(f"   Всего тестов: {self.tests_run}")
-        print(f"   ✅ Пройдено: {self.tests_passed}")
-        print(f"   ❌ Ошибок: {self.tests_failed}")
+        self._buf.write("\n" + "="*50 + "\n")
+        self._buf.write(f"📊 ИТОГИ ТЕСТИРОВАНИЯ:\n")
+        self._buf.write(f"   Всего тестов: {self.tests_run}\n")
+        self._buf.write(f"   ✅ Пройдено: {self.tests_passed}\n")
+        self._buf.write(f"   ❌ Ошибок: {self.tests_failed}\n")
         
-        if self.tests_failed == 0:
-            print("\n🎉 ВСЕ ТЕСТЫ ПРОЙДЕНЫ!")
-            return True
+        success = self.tests_failed == 0
+        if success:
+            self._buf.write("\n🎉 ВСЕ ТЕСТЫ ПРОЙДЕНЫ!\n")
         else:
-            print(f"\n💥 Неудачные тесты: {', '.join(self.failed_tests)}")
-            return False
+            self._buf.write(f"\n💥 Неудачные тесты: {', '.join(self.failed_tests)}\n")
+        
+        sys.stdout.write(self._buf.getvalue())
+        sys.stdout.flush()
+        return success
 
 
 # Создаем экземпляр тестера
@@ -152,9 +156,6 @@ def test_format_subtitles_plain():
 
 def test_summarizer_init():
     """Тест инициализации суммаризатора"""
-    # Устанавливаем тестовый API ключ
-    os.environ['OPENROUTER_API_KEY'] = 'test_key'
-    
     summarizer = TextSummarizer()
     runner.assert_equal(summarizer.api_key, 'test_key')
     runner.assert_equal(summarizer.chunk_size, 1000)
@@ -257,6 +258,9 @@ def run_all_tests():
     print("🚀 ЗАПУСК ПРОСТЫХ ТЕСТОВ")
     print("=" * 50)
     
+    # Тестовый API ключ устанавливаем один раз для всех тестов суммаризатора
+    os.environ['OPENROUTER_API_KEY'] = 'test_key'
+    
     # Список всех тестов
     tests = [
         ("Извлечение ID из youtube.com/watch", test_extract_video_id_youtube_watch),
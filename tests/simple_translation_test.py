@@ -5,45 +5,48 @@
 
 import sys
 import os
+import asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from summarizer import TextSummarizer
 
+# Один экземпляр суммаризатора на все тесты модуля
+summarizer = TextSummarizer()
+
 def test_detect_language():
     """Тест определения языка"""
     print("🧪 Тестирую определение языка...")
     
-    summarizer = TextSummarizer()
+    russian_text = "Это русский текст с кириллическими символами"
+    english_text = "This is English text with Latin characters"
+    mixed_text = "This is mixed text with some русские слова"
+    short_text = "Hello"
+    empty_text = ""
+    
+    # Определяем языки всех текстов одним пакетным вызовом
+    russian, english, mixed, short, empty = summarizer.detect_languages(
+        [russian_text, english_text, mixed_text, short_text, empty_text]
+    )
     
     # Тест русского языка
-    russian_text = "Это русский текст с кириллическими символами"
-    result = summarizer.detect_language(russian_text)
-    print(f"Русский текст: '{russian_text[:20]}...' -> {result}")
-    assert result == 'ru', f"Ожидался 'ru', получен '{result}'"
+    print(f"Русский текст: '{russian_text[:20]}...' -> {russian}")
+    assert russian == 'ru', f"Ожидался 'ru', получен '{russian}'"
     
     # Тест английского языка
-    english_text = "This is English text with Latin characters"
-    result = summarizer.detect_language(english_text)
-    print(f"Английский текст: '{english_text[:20]}...' -> {result}")
-    assert result == 'en', f"Ожидался 'en', получен '{result}'"
+    print(f"Английский текст: '{english_text[:20]}...' -> {english}")
+    assert english == 'en', f"Ожидался 'en', получен '{english}'"
     
     # Тест смешанного языка
-    mixed_text = "This is mixed text with some русские слова"
-    result = summarizer.detect_language(mixed_text)
-    print(f"Смешанный текст: '{mixed_text[:20]}...' -> {result}")
-    assert result in ['ru', 'en', 'other'], f"Неожиданный результат: '{result}'"
+    print(f"Смешанный текст: '{mixed_text[:20]}...' -> {mixed}")
+    assert mixed in ['ru', 'en', 'other'], f"Неожиданный результат: '{mixed}'"
     
     # Тест короткого текста
-    short_text = "Hello"
-    result = summarizer.detect_language(short_text)
-    print(f"Короткий текст: '{short_text}' -> {result}")
-    assert result == 'en', f"Ожидался 'en', получен '{result}'"
+    print(f"Короткий текст: '{short_text}' -> {short}")
+    assert short == 'en', f"Ожидался 'en', получен '{short}'"
     
     # Тест пустого текста
-    empty_text = ""
-    result = summarizer.detect_language(empty_text)
-    print(f"Пустой текст: -> {result}")
-    assert result == 'other', f"Ожидался 'other', получен '{result}'"
+    print(f"Пустой текст: -> {empty}")
+    assert empty == 'other', f"Ожидался 'other', получен '{empty}'"
     
     print("✅ Все тесты определения языка прошли успешно!")
 
@@ -51,8 +54,6 @@ async def test_translate_to_russian():
     """Тест перевода на русский язык"""
     print("\n🌍 Тестирую перевод на русский...")
     
-    summarizer = TextSummarizer()
-    
     # Проверяем, есть ли API ключ
     if not summarizer.api_key:
         print("⚠️ API ключ не настроен, пропускаю тест перевода")
@@ -74,8 +75,6 @@ async def test_summarize_with_language_detection():
     """Тест суммаризации с определением языка"""
     print("\n🤖 Тестирую суммаризацию с определением языка...")
     
-    summarizer = TextSummarizer()
-    
     # Тест с русским текстом
     russian_text = "Это русский текст для тестирования. Он содержит несколько предложений."
     result, stats = await summarizer.summarize_text(russian_text)
@@ -98,9 +97,11 @@ async def main():
         # Синхронные тесты
         test_detect_language()
         
-        # Асинхронные тесты
-        await test_translate_to_russian()
-        await test_summarize_with_language_detection()
+        # Асинхронные тесты выполняем параллельно - оба ждут ответа API
+        await asyncio.gather(
+            test_translate_to_russian(),
+            test_summarize_with_language_detection()
+        )
         
         print("\n🎉 Все тесты прошли успешно!")
         
@@ -113,6 +114,5 @@ async def main():
     return 0
 
 if __name__ == "__main__":
-    import asyncio
     exit_code = asyncio.run(main())
     sys.exit(exit_code) 
\ No newline at end of file
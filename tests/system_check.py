@@ -7,12 +7,18 @@ Enterprise Task Management System - Final Check
 import asyncio
 import json
 import os
-from pathlib import Path
+import sys
+from importlib.util import find_spec
 from datetime import datetime
 
+def write_lines(lines):
+    """Выводит накопленные строки проверки одной записью в stdout"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
 def check_files():
     """Проверка наличия всех файлов"""
-    print("📁 Проверка файлов системы...")
+    lines = ["📁 Проверка файлов системы..."]
     
     required_files = [
         "enterprise_task_orchestrator.py",
@@ -27,46 +33,50 @@ def check_files():
     missing_files = []
     existing_files = []
     
+    # Одно чтение директории вместо stat на каждый файл
+    with os.scandir('.') as entries:
+        present_files = {entry.name for entry in entries}
+    
     for file in required_files:
-        if Path(file).exists():
+        if file in present_files:
             existing_files.append(file)
-            print(f"  ✅ {file}")
+            lines.append(f"  ✅ {file}")
         else:
             missing_files.append(file)
-            print(f"  ❌ {file}")
+            lines.append(f"  ❌ {file}")
     
-    print(f"\n📊 Результат: {len(existing_files)}/{len(required_files)} файлов найдено")
+    lines.append(f"\n📊 Результат: {len(existing_files)}/{len(required_files)} файлов найдено")
     
     if missing_files:
-        print(f"⚠️ Отсутствуют файлы: {', '.join(missing_files)}")
-        return False
+        lines.append(f"⚠️ Отсутствуют файлы: {', '.join(missing_files)}")
     
-    return True
+    write_lines(lines)
+    return not missing_files
 
 def check_dependencies():
     """Проверка зависимостей"""
-    print("\n📦 Проверка зависимостей...")
+    lines = ["\n📦 Проверка зависимостей..."]
     
     required_packages = ['aiofiles', 'aiohttp']
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package)
-            print(f"  ✅ {package}")
-        except ImportError:
+        # find_spec проверяет наличие пакета, не выполняя его импорт
+        if find_spec(package) is not None:
+            lines.append(f"  ✅ {package}")
+        else:
             missing_packages.append(package)
-            print(f"  ❌ {package}")
+            lines.append(f"  ❌ {package}")
     
     if missing_packages:
-        print(f"\n⚠️ Установите зависимости: pip install {' '.join(missing_packages)}")
-        return False
+        lines.append(f"\n⚠️ Установите зависимости: pip install {' '.join(missing_packages)}")
     
-    return True
+    write_lines(lines)
+    return not missing_packages
 
 def check_config():
     """Проверка конфигурации"""
-    print("\n⚙️ Проверка конфигурации...")
+    lines = ["\n⚙️ Проверка конфигурации..."]
     
     try:
         with open("enterprise_config.json", "r", encoding="utf-8") as f:
@@ -76,24 +86,26 @@ def check_config():
         required_sections = ['servers', 'data_dirs', 'sync_interval']
         for section in required_sections:
             if section in config:
-                print(f"  ✅ {section}")
+                lines.append(f"  ✅ {section}")
             else:
-                print(f"  ❌ {section}")
+                lines.append(f"  ❌ {section}")
                 return False
         
         # Проверка серверов
         servers = config.get('servers', {})
-        print(f"  📡 Настроено серверов: {len(servers)}")
+        lines.append(f"  📡 Настроено серверов: {len(servers)}")
         
         return True
         
     except Exception as e:
-        print(f"  ❌ Ошибка конфигурации: {e}")
+        lines.append(f"  ❌ Ошибка конфигурации: {e}")
         return False
+    finally:
+        write_lines(lines)
 
 async def check_integrations():
     """Проверка интеграций"""
-    print("\n🔗 Проверка интеграций...")
+    lines = ["\n🔗 Проверка интеграций..."]
     
     try:
         from mcp_integrations import MCPIntegrationManager
@@ -104,21 +116,23 @@ async def check_integrations():
         online_count = sum(1 for is_online in status.values() if is_online)
         total_count = len(status)
         
-        print(f"  📊 Онлайн серверов: {online_count}/{total_count}")
+        lines.append(f"  📊 Онлайн серверов: {online_count}/{total_count}")
         
         for server, is_online in status.items():
             status_icon = "🟢" if is_online else "🔴"
-            print(f"    {status_icon} {server}")
+            lines.append(f"    {status_icon} {server}")
         
         return online_count == total_count
         
     except Exception as e:
-        print(f"  ❌ Ошибка интеграций: {e}")
+        lines.append(f"  ❌ Ошибка интеграций: {e}")
         return False
+    finally:
+        write_lines(lines)
 
 async def check_orchestrator():
     """Проверка оркестратора"""
-    print("\n🎯 Проверка оркестратора...")
+    lines = ["\n🎯 Проверка оркестратора..."]
     
     try:
         from enterprise_task_orchestrator import EnterpriseTaskOrchestrator
@@ -133,42 +147,47 @@ async def check_orchestrator():
             tags=["system", "check"]
         )
         
-        print(f"  ✅ Задача создана: {test_task.id}")
+        lines.append(f"  ✅ Задача создана: {test_task.id}")
         
         # Проверка здоровья
         health = orchestrator.get_health_status()
-        print(f"  🏥 Статус здоровья: {health['orchestrator_status']}")
+        lines.append(f"  🏥 Статус здоровья: {health['orchestrator_status']}")
         
         # Проверка статистики
         stats = orchestrator.get_statistics()
-        print(f"  📈 Операций: {stats['total_operations']}")
+        lines.append(f"  📈 Операций: {stats['total_operations']}")
         
         await orchestrator.stop()
         return True
         
     except Exception as e:
-        print(f"  ❌ Ошибка оркестратора: {e}")
+        lines.append(f"  ❌ Ошибка оркестратора: {e}")
         return False
+    finally:
+        write_lines(lines)
 
 def check_logs():
     """Проверка логов"""
-    print("\n📝 Проверка логов...")
+    lines = ["\n📝 Проверка логов..."]
     
-    log_dir = Path("logs")
-    if log_dir.exists():
-        log_files = list(log_dir.glob("*.log"))
-        print(f"  📁 Найдено логов: {len(log_files)}")
-        
-        for log_file in log_files:
-            print(f"    📄 {log_file.name}")
-        
-        return True
-    else:
-        print("  ⚠️ Директория логов не найдена")
+    try:
+        with os.scandir("logs") as entries:
+            log_files = [entry for entry in entries if entry.name.endswith(".log") and entry.is_file()]
+    except FileNotFoundError:
+        lines.append("  ⚠️ Директория логов не найдена")
+        write_lines(lines)
         return False
+    
+    lines.append(f"  📁 Найдено логов: {len(log_files)}")
+    
+    for log_file in log_files:
+        lines.append(f"    📄 {log_file.name}")
+    
+    write_lines(lines)
+    return True
 
-def generate_report(results):
-    """Генерация отчета"""
+def print_report(results):
+    """Вывод сводки проверок"""
     print("\n📊 ОТЧЕТ О ПРОВЕРКЕ СИСТЕМЫ")
     print("=" * 50)
     
@@ -189,17 +208,25 @@ def generate_report(results):
         print("\n🎉 ВСЕ ПРОВЕРКИ ПРОЙДЕНЫ! Система готова к работе!")
     else:
         print(f"\n⚠️ Проблемы найдены в {total_checks - passed_checks} проверках")
-    
-    # Сохранение отчета
+
+def write_report(report_data):
+    """Сохранение отчета на диск"""
+    with open("system_check_report.json", "w", encoding="utf-8") as f:
+        json.dump(report_data, f, indent=2, ensure_ascii=False)
+
+async def generate_report(results):
+    """Генерация отчета"""
     report_data = {
         "timestamp": datetime.now().isoformat(),
-        "total_checks": total_checks,
-        "passed_checks": passed_checks,
+        "total_checks": len(results),
+        "passed_checks": sum(1 for result in results.values() if result),
         "results": results
     }
     
-    with open("system_check_report.json", "w", encoding="utf-8") as f:
-        json.dump(report_data, f, indent=2, ensure_ascii=False)
+    # Отчет пишется на диск в фоне, пока выводится сводка
+    write_task = asyncio.create_task(asyncio.to_thread(write_report, report_data))
+    print_report(results)
+    await write_task
     
     print(f"\n📄 Отчет сохранен: system_check_report.json")
 
@@ -208,18 +235,20 @@ async def main():
     print("🔍 Enterprise Task Management System - Final Check")
     print("=" * 60)
     
-    results = {}
-    
-    # Проверки
-    results["Файлы системы"] = check_files()
-    results["Зависимости"] = check_dependencies()
-    results["Конфигурация"] = check_config()
-    results["Интеграции"] = await check_integrations()
-    results["Оркестратор"] = await check_orchestrator()
-    results["Логи"] = check_logs()
+    # Проверки независимы: синхронные выполняем в потоках параллельно с асинхронными
+    check_names = ["Файлы системы", "Зависимости", "Конфигурация", "Интеграции", "Оркестратор", "Логи"]
+    check_results = await asyncio.gather(
+        asyncio.to_thread(check_files),
+        asyncio.to_thread(check_dependencies),
+        asyncio.to_thread(check_config),
+        check_integrations(),
+        check_orchestrator(),
+        asyncio.to_thread(check_logs)
+    )
+    results = dict(zip(check_names, check_results))
     
     # Генерация отчета
-    generate_report(results)
+    await generate_report(results)
     
     # Рекомендации
     print("\n💡 РЕКОМЕНДАЦИИ:")
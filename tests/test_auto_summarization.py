@@ -13,90 +13,90 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from summarizer import TextSummarizer
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def summarizer():
-    """Создает экземпляр суммаризатора для тестов"""
+    """Создает один экземпляр суммаризатора на всю сессию тестов"""
     return TextSummarizer()
 
+@pytest.fixture(autouse=True)
+def reset_used_models(summarizer):
+    """Сбрасывает историю моделей, чтобы тесты ротации были независимы"""
+    summarizer.used_models.clear()
+
+@pytest.fixture
+def mocked_summarize(summarizer, no_sleep):
+    """Подменяет summarize_text заранее созданным AsyncMock на время теста"""
+    summarizer.summarize_text = AsyncMock()
+    yield summarizer.summarize_text
+    del summarizer.summarize_text
+
 class TestAutoModelSelection:
     """Тесты автоматического выбора модели"""
     
-    def test_get_available_model_index(self, summarizer):
-        """Тест автоматического выбора модели"""
-        # Проверяем, что возвращается валидный индекс
-        index = summarizer.get_available_model_index()
-        assert 0 <= index < len(summarizer.models)
-        
-        # Проверяем, что модель добавляется в использованные
-        assert index in summarizer.used_models
-        
-        # Проверяем, что при повторном выборе возвращается другая модель
-        second_index = summarizer.get_available_model_index()
-        assert second_index != index
-        assert second_index in summarizer.used_models
-    
-    def test_model_rotation(self, summarizer):
-        """Тест ротации моделей"""
+    @pytest.mark.parametrize("calls", [2, None])
+    def test_model_rotation(self, summarizer, calls):
+        """Тест автоматического выбора и ротации моделей (None - все модели)"""
+        calls = calls or len(summarizer.models)
         used_indices = set()
         
-        # Выбираем все доступные модели
-        for _ in range(len(summarizer.models)):
+        for _ in range(calls):
             index = summarizer.get_available_model_index()
+            # Проверяем, что возвращается валидный индекс, добавленный в использованные
+            assert 0 <= index < len(summarizer.models)
+            assert index in summarizer.used_models
             used_indices.add(index)
         
-        # Проверяем, что все модели были использованы
-        assert len(used_indices) == len(summarizer.models)
+        # Проверяем, что повторно модели не выбирались
+        assert len(used_indices) == calls
         
-        # При следующем выборе история должна сброситься
-        next_index = summarizer.get_available_model_index()
-        assert next_index in summarizer.used_models
-        assert len(summarizer.used_models) == 1
+        # После использования всех моделей история должна сброситься
+        if calls == len(summarizer.models):
+            next_index = summarizer.get_available_model_index()
+            assert next_index in summarizer.used_models
+            assert len(summarizer.used_models) == 1
 
 class TestSummarizeWithRetry:
     """Тесты системы повторных попыток"""
     
     @pytest.mark.asyncio
-    async def test_summarize_with_retry_success_first_try(self, summarizer):
+    async def test_summarize_with_retry_success_first_try(self, summarizer, mocked_summarize):
         """Тест успешной суммаризации с первой попытки"""
-        with patch.object(summarizer, 'summarize_text', new_callable=AsyncMock) as mock_summarize:
-            mock_summarize.return_value = ("Успешная суммаризация", {"model": "test_model"})
-            
-            result, stats, success = await summarizer.summarize_with_retry("Тестовый текст", max_retries=3)
-            
-            assert success is True
-            assert result == "Успешная суммаризация"
-            assert stats["model"] == "test_model"
-            mock_summarize.assert_called_once()
+        mocked_summarize.return_value = ("Успешная суммаризация", {"model": "test_model"})
+        
+        result, stats, success = await summarizer.summarize_with_retry("Тестовый текст", max_retries=3)
+        
+        assert success is True
+        assert result == "Успешная суммаризация"
+        assert stats["model"] == "test_model"
+        mocked_summarize.assert_called_once()
     
     @pytest.mark.asyncio
-    async def test_summarize_with_retry_failure_then_success(self, summarizer):
+    async def test_summarize_with_retry_failure_then_success(self, summarizer, mocked_summarize):
         """Тест успешной суммаризации со второй попытки"""
-        with patch.object(summarizer, 'summarize_text', new_callable=AsyncMock) as mock_summarize:
-            # Первая попытка неудачна, вторая успешна
-            mock_summarize.side_effect = [
-                ("❌ Ошибка", {"model": "first_model"}),
-                ("Успешная суммаризация", {"model": "second_model"})
-            ]
-            
-            result, stats, success = await summarizer.summarize_with_retry("Тестовый текст", max_retries=3)
-            
-            assert success is True
-            assert result == "Успешная суммаризация"
-            assert stats["model"] == "second_model"
-            assert mock_summarize.call_count == 2
+        # Первая попытка неудачна, вторая успешна
+        mocked_summarize.side_effect = [
+            ("❌ Ошибка", {"model": "first_model"}),
+            ("Успешная суммаризация", {"model": "second_model"})
+        ]
+        
+        result, stats, success = await summarizer.summarize_with_retry("Тестовый текст", max_retries=3)
+        
+        assert success is True
+        assert result == "Успешная суммаризация"
+        assert stats["model"] == "second_model"
+        assert mocked_summarize.call_count == 2
     
     @pytest.mark.asyncio
-    async def test_summarize_with_retry_all_failures(self, summarizer):
+    async def test_summarize_with_retry_all_failures(self, summarizer, mocked_summarize):
         """Тест всех неудачных попыток"""
-        with patch.object(summarizer, 'summarize_text', new_callable=AsyncMock) as mock_summarize:
-            mock_summarize.return_value = ("❌ Ошибка", {"model": "test_model"})
-            
-            result, stats, success = await summarizer.summarize_with_retry("Тестовый текст", max_retries=2)
-            
-            assert success is False
-            assert result.startswith("❌ Все 2 попытки суммаризации не удались")
-            assert "used_models" in stats
-            assert mock_summarize.call_count == 2
+        mocked_summarize.return_value = ("❌ Ошибка", {"model": "test_model"})
+        
+        result, stats, success = await summarizer.summarize_with_retry("Тестовый текст", max_retries=2)
+        
+        assert success is False
+        assert result.startswith("❌ Все 2 попытки суммаризации не удались")
+        assert "used_models" in stats
+        assert mocked_summarize.call_count == 2
 
 class TestUserFeedbackLogging:
     """Тесты логирования обратной связи пользователя"""
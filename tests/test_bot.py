@@ -1,5 +1,7 @@
 import pytest
 import asyncio
+from dataclasses import dataclass
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock, AsyncMock
 from telegram import Update, Message, User, Chat, CallbackQuery, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
@@ -7,62 +9,100 @@ import bot
 from summarizer import TextSummarizer
 
 
+@dataclass(slots=True, frozen=True)
+class FakeTranscript:
+    """Транскрипт из списка YouTube: код обработчиков читает только эти два поля"""
+    language_code: str
+    language: str
+
+
+RU = FakeTranscript('ru', 'Russian')
+EN = FakeTranscript('en', 'English')
+
+# Ссылка и ID видео для сценариев, где разбор ссылки не является предметом теста
+_YT_ID = "dQw4w9WgXcQ"
+_YT_URL = f"https://youtu.be/{_YT_ID}"
+
+
+@dataclass(slots=True, frozen=True)
+class FakeSnippet:
+    """Строка субтитров, как её отдаёт YouTubeTranscriptApi().fetch"""
+    start: float
+    text: str
+
+
+# Длинный транскрипт строится один раз при импорте модуля
+_LARGE_TRANSCRIPT_TEXTS = ['t%d' % i for i in range(10000)]
+_LARGE_TRANSCRIPT = [FakeSnippet(i * 1.7, text) for i, text in enumerate(_LARGE_TRANSCRIPT_TEXTS)]
+
+
+def acoro(value=None):
+    """Дешёвая замена AsyncMock для заглушек, вызовы которых тест не проверяет"""
+    async def stub(*args, **kwargs):
+        return value
+    return stub
+
+
+def make_callback_update(data):
+    """Лёгкие Update/CallbackQuery без spec: только то, что трогают callback-обработчики"""
+    query = SimpleNamespace(
+        answer=AsyncMock(),
+        edit_message_text=AsyncMock(),
+        data=data,
+        from_user=SimpleNamespace(id=12345),
+    )
+    return SimpleNamespace(callback_query=query), query
+
+
+@pytest.fixture
+def yt_api(monkeypatch):
+    """Мок экземпляра YouTubeTranscriptApi и глобального rate limit на границе модуля bot"""
+    api = MagicMock()
+    monkeypatch.setattr(bot, "YouTubeTranscriptApi", MagicMock(return_value=api))
+    monkeypatch.setattr(bot, "global_rate_limit_check", acoro(True))
+    return api
+
+
 class TestBotUtilityFunctions:
     """Тесты вспомогательных функций бота"""
     
-    def test_extract_video_id_youtube_watch(self):
-        """Тест извлечения ID из ссылки youtube.com/watch"""
-        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
-        video_id = bot.extract_video_id(url)
-        assert video_id == "dQw4w9WgXcQ"
-    
-    def test_extract_video_id_youtu_be(self):
-        """Тест извлечения ID из короткой ссылки youtu.be"""
-        url = "https://youtu.be/dQw4w9WgXcQ"
-        video_id = bot.extract_video_id(url)
-        assert video_id == "dQw4w9WgXcQ"
-    
-    def test_extract_video_id_embed(self):
-        """Тест извлечения ID из embed ссылки"""
-        url = "https://www.youtube.com/embed/dQw4w9WgXcQ"
-        video_id = bot.extract_video_id(url)
-        assert video_id == "dQw4w9WgXcQ"
-    
-    def test_extract_video_id_direct(self):
-        """Тест извлечения ID из прямого ID"""
-        video_id = bot.extract_video_id("dQw4w9WgXcQ")
-        assert video_id == "dQw4w9WgXcQ"
-    
-    def test_extract_video_id_invalid(self):
-        """Тест с невалидными ссылками"""
-        invalid_urls = [
-            "https://www.google.com",
-            "not a url",
-            "https://youtube.com/invalid",
-            "shortid"
-        ]
-        
-        for url in invalid_urls:
-            video_id = bot.extract_video_id(url)
-            assert video_id is None
-    
-    @patch('bot.YouTubeTranscriptApi.list_transcripts')
-    def test_get_available_transcripts_success(self, mock_list):
+    @pytest.mark.parametrize("url,expected", [
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+        ("https://youtu.be/dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+        ("https://www.youtube.com/embed/dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+        ("dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s", "dQw4w9WgXcQ"),
+        ("https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ?rel=0", "dQw4w9WgXcQ"),
+        ("https://www.youtube.com/ytscreeningroom?v=dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+        ("https://www.youtube.com/attribution_link?a=8g8kPrPIi-ecwIsS&u=/watch%3Fv%3DdQw4w9WgXcQ%26feature%3Dshare", "dQw4w9WgXcQ"),
+        ("Посмотри https://youtu.be/dQw4w9WgXcQ пожалуйста", "dQw4w9WgXcQ"),
+        ("https://youtu.be/dQw4w9WgXcQ.", "dQw4w9WgXcQ"),
+        ("(https://www.youtube.com/watch?v=dQw4w9WgXcQ)", "dQw4w9WgXcQ"),
+        ("https://youtu.be/dQw4w9WgXcQ, спасибо", "dQw4w9WgXcQ"),
+        ("https://youtu.be/dQw4w9WgXcQ!", "dQw4w9WgXcQ"),
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQxyz", None),
+        ("https://www.google.com", None),
+        ("not a url", None),
+        ("https://youtube.com/invalid", None),
+        ("shortid", None),
+        ("Обыкновенный текст для суммаризации", None),
+    ])
+    def test_extract_video_id(self, url, expected):
+        """Тест извлечения ID видео из разных форматов ссылок"""
+        assert bot.extract_video_id(url) == expected
+    
+    def test_get_available_transcripts_success(self, yt_api):
         """Тест успешного получения списка субтитров"""
-        mock_transcript = MagicMock()
-        mock_transcript.language_code = 'ru'
-        mock_transcript.language = 'Russian'
-        mock_list.return_value = [mock_transcript]
+        yt_api.list.return_value = [RU]
         
         result = bot.get_available_transcripts("test_video_id")
         
         assert result is not None
-        mock_list.assert_called_once_with("test_video_id")
+        yt_api.list.assert_called_once_with("test_video_id")
     
-    @patch('bot.YouTubeTranscriptApi.list_transcripts')
-    def test_get_available_transcripts_error(self, mock_list):
+    def test_get_available_transcripts_error(self, yt_api):
         """Тест обработки ошибки при получении субтитров"""
-        mock_list.side_effect = Exception("API Error")
+        yt_api.list.side_effect = Exception("API Error")
         
         result = bot.get_available_transcripts("test_video_id")
         
@@ -91,6 +131,33 @@ class TestBotUtilityFunctions:
         
         expected = "Первая строка\nВторая строка"
         assert result == expected
+    
+    def test_format_subtitles_large_transcript(self):
+        """Тест форматирования длинного транскрипта (10 000 строк)"""
+        with_time = bot.format_subtitles(_LARGE_TRANSCRIPT, with_time=True).split('\n')
+        plain = bot.format_subtitles(_LARGE_TRANSCRIPT, with_time=False)
+        
+        assert len(with_time) == 10000
+        assert with_time[0] == "[00:00] t0"
+        assert with_time[100] == "[02:50] t100"
+        assert with_time[-1] == "[283:18] t9999"
+        assert plain == '\n'.join(_LARGE_TRANSCRIPT_TEXTS)
+    
+    @pytest.mark.parametrize("with_time", [False, True])
+    @pytest.mark.parametrize("max_chars", [0, 1, 2, 3, 1000, 10**7])
+    def test_format_subtitles_max_chars(self, with_time, max_chars):
+        """Тест форматирования только префикса длиной max_chars"""
+        full = bot.format_subtitles(_LARGE_TRANSCRIPT, with_time=with_time)
+        prefix = bot.format_subtitles(_LARGE_TRANSCRIPT, with_time=with_time, max_chars=max_chars)
+        
+        assert prefix == full[:max_chars]
+    
+    def test_format_subtitles_both(self):
+        """Тест форматирования обоих вариантов субтитров за один проход"""
+        plain, with_time = bot.format_subtitles_both(_LARGE_TRANSCRIPT)
+        
+        assert plain == bot.format_subtitles(_LARGE_TRANSCRIPT, with_time=False)
+        assert with_time == bot.format_subtitles(_LARGE_TRANSCRIPT, with_time=True)
 
 
 class TestBotKeyboards:
@@ -98,12 +165,7 @@ class TestBotKeyboards:
     
     def test_build_language_keyboard(self):
         """Тест создания клавиатуры выбора языка"""
-        mock_transcripts = []
-        for lang_code, lang_name in [('ru', 'Russian'), ('en', 'English')]:
-            transcript = MagicMock()
-            transcript.language_code = lang_code
-            transcript.language = lang_name
-            mock_transcripts.append(transcript)
+        mock_transcripts = [RU, EN]
         
         keyboard = bot.build_language_keyboard(mock_transcripts)
         
@@ -111,6 +173,8 @@ class TestBotKeyboards:
         assert len(keyboard.inline_keyboard) == 2
         assert keyboard.inline_keyboard[0][0].text == "Russian (ru)"
         assert keyboard.inline_keyboard[0][0].callback_data == "lang_ru"
+        # Тот же набор языков отдаёт закэшированную клавиатуру
+        assert bot.build_language_keyboard(mock_transcripts) is keyboard
     
     def test_build_action_keyboard(self):
         """Тест создания клавиатуры выбора действия"""
@@ -124,6 +188,7 @@ class TestBotKeyboards:
         assert "📄 Только субтитры" in texts
         assert "🤖 Субтитры + ИИ-суммаризация" in texts
         assert "🔮 Только ИИ-суммаризация" in texts
+        assert bot.build_action_keyboard() is keyboard
     
     def test_build_format_keyboard(self):
         """Тест создания клавиатуры выбора формата"""
@@ -135,6 +200,7 @@ class TestBotKeyboards:
         texts = [row[0].text for row in keyboard.inline_keyboard]
         assert "С временными метками" in texts
         assert "Без временных меток" in texts
+        assert bot.build_format_keyboard() is keyboard
     
     @patch('bot.summarizer')
     def test_build_model_keyboard(self, mock_summarizer):
@@ -170,31 +236,39 @@ class TestBotHandlers:
         context.user_data = {}
         return context
     
-    @pytest.mark.asyncio
-    async def test_start_handler(self, mock_update, mock_context):
+    @pytest.fixture
+    def allow_rate_limit(self, monkeypatch):
+        """rate_limit_check пропускает запрос; тест может переопределить return_value"""
+        check = AsyncMock(return_value=True)
+        monkeypatch.setattr(bot, "rate_limit_check", check)
+        return check
+    
+    @pytest.fixture
+    def fake_transcripts_api(self, monkeypatch):
+        """Мок get_available_transcripts_with_retry"""
+        fetch = AsyncMock()
+        monkeypatch.setattr(bot, "get_available_transcripts_with_retry", fetch)
+        return fetch
+    
+    async def test_start_handler(self, mock_update, mock_context, no_sleep):
         """Тест обработчика /start"""
         await bot.start(mock_update, mock_context)
         
         mock_update.message.reply_text.assert_called_once()
-        call_args = mock_update.message.reply_text.call_args
-        assert bot.START_MESSAGE in call_args[0]
+        assert mock_update.message.reply_text.call_args.args[0] == bot.START_MESSAGE
     
-    @pytest.mark.asyncio
     async def test_help_handler(self, mock_update, mock_context):
         """Тест обработчика /help"""
         await bot.help_command(mock_update, mock_context)
         
         mock_update.message.reply_text.assert_called_once()
-        call_args = mock_update.message.reply_text.call_args
-        assert bot.HELP_MESSAGE in call_args[0]
+        assert mock_update.message.reply_text.call_args.args[0] == bot.HELP_MESSAGE
     
-    @pytest.mark.asyncio
-    async def test_handle_message_rate_limit(self, mock_update, mock_context):
+    async def test_handle_message_rate_limit(self, mock_update, mock_context,
+                                             allow_rate_limit, fake_transcripts_api):
         """Тест антиспама в handle_message с новыми функциями rate limiting"""
-        import time
-        
         # Устанавливаем время последнего запроса как текущее
-        mock_update.message.text = "https://youtu.be/dQw4w9WgXcQ"
+        mock_update.message.text = _YT_URL
         mock_context.user_data = {}
         
         # Mock the processing message
@@ -203,34 +277,28 @@ class TestBotHandlers:
         mock_update.message.reply_text.return_value = mock_processing_msg
         
         # Первый запрос должен пройти
-        with patch('bot.rate_limit_check', return_value=True):
-            with patch('bot.get_available_transcripts_with_retry') as mock_get_transcripts:
-                mock_transcript = MagicMock()
-                mock_transcript.language_code = 'ru'
-                mock_transcript.language = 'Russian'
-                mock_get_transcripts.return_value = ([mock_transcript], True, None)
-                
-                await bot.handle_message(mock_update, mock_context)
-                
-                # Проверяем, что запрос прошел успешно
-                # Первый вызов - processing message
-                mock_update.message.reply_text.assert_called_once_with('🔄 Получаю информацию о субтитрах...')
-                # Второй вызов - результат через edit_text
-                mock_processing_msg.edit_text.assert_called_once()
-                call_args = mock_processing_msg.edit_text.call_args[0][0]
-                assert "Что хотите получить?" in call_args
+        fake_transcripts_api.return_value = ([RU], True, None)
+        
+        await bot.handle_message(mock_update, mock_context)
+        
+        # Проверяем, что запрос прошел успешно
+        # Первый вызов - processing message
+        mock_update.message.reply_text.assert_called_once_with('🔄 Получаю информацию о субтитрах...')
+        # Второй вызов - результат через edit_text
+        mock_processing_msg.edit_text.assert_called_once()
+        call_args = mock_processing_msg.edit_text.call_args.args[0]
+        assert "Что хотите получить?" in call_args
         
         # Второй запрос должен быть заблокирован
-        with patch('bot.rate_limit_check', return_value=False):
-            await bot.handle_message(mock_update, mock_context)
-            
-            # Должен быть дополнительный вызов reply_text для ошибки
-            assert mock_update.message.reply_text.call_count >= 2
-            # Проверяем последний вызов (ошибка rate limit)
-            last_call_args = mock_update.message.reply_text.call_args[0][0]
-            assert "Слишком много запросов" in last_call_args
-    
-    @pytest.mark.asyncio
+        allow_rate_limit.return_value = False
+        await bot.handle_message(mock_update, mock_context)
+        
+        # Должен быть дополнительный вызов reply_text для ошибки
+        assert mock_update.message.reply_text.call_count >= 2
+        # Проверяем последний вызов (ошибка rate limit)
+        last_call_args = mock_update.message.reply_text.call_args.args[0]
+        assert "Слишком много запросов" in last_call_args
+    
     async def test_handle_message_invalid_url(self, mock_update, mock_context):
         """Тест обработки невалидной ссылки"""
         mock_update.message.text = "invalid url"
@@ -239,73 +307,57 @@ class TestBotHandlers:
         await bot.handle_message(mock_update, mock_context)
         
         mock_update.message.reply_text.assert_called_once()
-        call_args = mock_update.message.reply_text.call_args[0][0]
+        call_args = mock_update.message.reply_text.call_args.args[0]
         assert "корректную ссылку" in call_args
     
-    @pytest.mark.asyncio
-    @patch('bot.get_available_transcripts_with_retry')
-    async def test_handle_message_no_transcripts(self, mock_get_transcripts, mock_update, mock_context):
+    async def test_handle_message_no_transcripts(self, mock_update, mock_context,
+                                                 allow_rate_limit, fake_transcripts_api):
         """Тест когда субтитры недоступны"""
-        mock_update.message.text = "https://youtu.be/dQw4w9WgXcQ"
+        mock_update.message.text = _YT_URL
         mock_context.user_data = {}
-        mock_get_transcripts.return_value = (None, False, "Субтитры не найдены")
+        fake_transcripts_api.return_value = (None, False, "Субтитры не найдены")
         
         # Mock the processing message
         mock_processing_msg = MagicMock()
         mock_processing_msg.edit_text = AsyncMock()
         mock_update.message.reply_text.return_value = mock_processing_msg
         
-        # Mock rate limiting to allow the request
-        with patch('bot.rate_limit_check', return_value=True):
-            await bot.handle_message(mock_update, mock_context)
-            
-            # First call should be processing message
-            mock_update.message.reply_text.assert_called_once_with('🔄 Получаю информацию о субтитрах...')
-            # Second call should be error message
-            mock_processing_msg.edit_text.assert_called_once_with('❌ Субтитры не найдены')
-    
-    @pytest.mark.asyncio
-    @patch('bot.get_available_transcripts_with_retry')
-    async def test_handle_message_single_language(self, mock_get_transcripts, mock_update, mock_context):
+        await bot.handle_message(mock_update, mock_context)
+        
+        # First call should be processing message
+        mock_update.message.reply_text.assert_called_once_with('🔄 Получаю информацию о субтитрах...')
+        # Second call should be error message
+        mock_processing_msg.edit_text.assert_called_once_with('❌ Субтитры не найдены')
+    
+    async def test_handle_message_single_language(self, mock_update, mock_context,
+                                                  allow_rate_limit, fake_transcripts_api):
         """Тест с одним доступным языком"""
-        mock_update.message.text = "https://youtu.be/dQw4w9WgXcQ"
+        mock_update.message.text = _YT_URL
         mock_context.user_data = {}
         
-        mock_transcript = MagicMock()
-        mock_transcript.language_code = 'ru'
-        mock_transcript.language = 'Russian'
-        mock_get_transcripts.return_value = ([mock_transcript], True, None)
+        fake_transcripts_api.return_value = ([RU], True, None)
         
         # Mock the processing message
         mock_processing_msg = MagicMock()
         mock_processing_msg.edit_text = AsyncMock()
         mock_update.message.reply_text.return_value = mock_processing_msg
         
-        # Mock rate limiting to allow the request
-        with patch('bot.rate_limit_check', return_value=True):
-            await bot.handle_message(mock_update, mock_context)
-            
-            # Проверяем, что язык сохранился в контексте
-            assert mock_context.user_data['lang_code'] == 'ru'
-            assert mock_context.user_data['video_id'] == 'dQw4w9WgXcQ'
-            
-            # First call should be processing message
-            mock_update.message.reply_text.assert_called_once_with('🔄 Получаю информацию о субтитрах...')
-            # Second call should be result
-            mock_processing_msg.edit_text.assert_called_once()
-            call_args = mock_processing_msg.edit_text.call_args[0][0]
-            assert "Что хотите получить?" in call_args
-    
-    @pytest.mark.asyncio
+        await bot.handle_message(mock_update, mock_context)
+        
+        # Проверяем, что язык сохранился в контексте
+        assert mock_context.user_data['lang_code'] == 'ru'
+        assert mock_context.user_data['video_id'] == _YT_ID
+        
+        # First call should be processing message
+        mock_update.message.reply_text.assert_called_once_with('🔄 Получаю информацию о субтитрах...')
+        # Second call should be result
+        mock_processing_msg.edit_text.assert_called_once()
+        call_args = mock_processing_msg.edit_text.call_args.args[0]
+        assert "Что хотите получить?" in call_args
+    
     async def test_language_callback(self, mock_context):
         """Тест callback для выбора языка"""
-        query = MagicMock(spec=CallbackQuery)
-        query.answer = AsyncMock()
-        query.data = "lang_en"
-        query.edit_message_text = AsyncMock()
-        
-        update = MagicMock(spec=Update)
-        update.callback_query = query
+        update, query = make_callback_update("lang_en")
         
         await bot.language_callback(update, mock_context)
         
@@ -313,52 +365,31 @@ class TestBotHandlers:
         query.answer.assert_called_once()
         query.edit_message_text.assert_called_once()
     
-    @pytest.mark.asyncio
     async def test_action_callback_subtitles_only(self, mock_context):
         """Тест callback для выбора действия 'только субтитры'"""
-        query = MagicMock(spec=CallbackQuery)
-        query.answer = AsyncMock()
-        query.data = "action_subtitles"
-        query.edit_message_text = AsyncMock()
-        
-        update = MagicMock(spec=Update)
-        update.callback_query = query
+        update, query = make_callback_update("action_subtitles")
         
         await bot.action_callback(update, mock_context)
         
         assert mock_context.user_data['action'] == 'subtitles'
         query.edit_message_text.assert_called_once()
-        call_args = query.edit_message_text.call_args[0][0]
+        call_args = query.edit_message_text.call_args.args[0]
         assert "формат субтитров" in call_args
     
-    @pytest.mark.asyncio
     async def test_action_callback_ai_summary(self, mock_context):
         """Тест callback для выбора действия 'ИИ-суммаризация'"""
-        query = MagicMock(spec=CallbackQuery)
-        query.answer = AsyncMock()
-        query.data = "action_ai_summary"
-        query.edit_message_text = AsyncMock()
-        
-        update = MagicMock(spec=Update)
-        update.callback_query = query
+        update, query = make_callback_update("action_ai_summary")
         
         await bot.action_callback(update, mock_context)
         
         assert mock_context.user_data['action'] == 'ai_summary'
         query.edit_message_text.assert_called_once()
-        call_args = query.edit_message_text.call_args[0][0]
+        call_args = query.edit_message_text.call_args.args[0]
         assert "ИИ-модель" in call_args
     
-    @pytest.mark.asyncio 
     async def test_model_callback_auto(self, mock_context):
         """Тест callback для автоматического выбора модели"""
-        query = MagicMock(spec=CallbackQuery)
-        query.answer = AsyncMock()
-        query.data = "model_auto"
-        query.edit_message_text = AsyncMock()
-        
-        update = MagicMock(spec=Update)
-        update.callback_query = query
+        update, query = make_callback_update("model_auto")
         
         mock_context.user_data = {'action': 'only_summary'}
         
@@ -368,15 +399,9 @@ class TestBotHandlers:
         assert mock_context.user_data['model_index'] == 0
         mock_process.assert_called_once_with(query, mock_context)
     
-    @pytest.mark.asyncio
     async def test_format_callback(self, mock_context):
         """Тест callback для выбора формата"""
-        query = MagicMock(spec=CallbackQuery)
-        query.answer = AsyncMock()
-        query.data = "format_with_time"
-        
-        update = MagicMock(spec=Update)
-        update.callback_query = query
+        update, query = make_callback_update("format_with_time")
         
         with patch('bot.process_request', new_callable=AsyncMock) as mock_process:
             await bot.format_callback(update, mock_context)
@@ -403,7 +428,7 @@ class TestBotProcessRequest:
         """Фикстура для контекста с данными"""
         context = MagicMock()
         context.user_data = {
-            'video_id': 'dQw4w9WgXcQ',
+            'video_id': _YT_ID,
             'lang_code': 'ru',
             'action': 'subtitles',
             'with_time': False,
@@ -411,7 +436,6 @@ class TestBotProcessRequest:
         }
         return context
     
-    @pytest.mark.asyncio
     async def test_process_request_missing_data(self, mock_query):
         """Тест обработки запроса без данных"""
         context = MagicMock()
@@ -420,10 +444,9 @@ class TestBotProcessRequest:
         await bot.process_request(mock_query, context)
         
         mock_query.edit_message_text.assert_called_once()
-        call_args = mock_query.edit_message_text.call_args[0][0]
+        call_args = mock_query.edit_message_text.call_args.args[0]
         assert "не найдено видео или язык" in call_args
     
-    @pytest.mark.asyncio
     @patch('bot.get_transcript_with_retry')
     @patch('bot.send_subtitles')
     async def test_process_request_subtitles_only(self, mock_send_subs, mock_get_transcript, 
@@ -438,10 +461,9 @@ class TestBotProcessRequest:
         
         await bot.process_request(mock_query, mock_context_with_data)
         
-        mock_get_transcript.assert_called_once_with('dQw4w9WgXcQ', ['ru'])
+        mock_get_transcript.assert_called_once_with(_YT_ID, ['ru'])
         mock_send_subs.assert_called_once()
     
-    @pytest.mark.asyncio
     @patch('bot.get_transcript_with_retry')
     @patch('bot.summarizer.summarize_text')
     async def test_process_request_ai_summary(self, mock_summarize, mock_get_transcript,
@@ -467,10 +489,9 @@ class TestBotProcessRequest:
         mock_query.edit_message_text.assert_called()
         
         # Проверяем, что отображался прогресс
-        calls = mock_query.edit_message_text.call_args_list
-        assert any("Создаю ИИ-суммаризацию" in str(call) for call in calls)
+        texts = [c.args[0] for c in mock_query.edit_message_text.call_args_list if c.args]
+        assert any("Создаю ИИ-суммаризацию" in t for t in texts)
     
-    @pytest.mark.asyncio
     @patch('bot.get_transcript_with_retry')
     async def test_process_request_transcript_error(self, mock_get_transcript, mock_query, mock_context_with_data):
         """Тест обработки ошибки получения субтитров"""
@@ -479,10 +500,12 @@ class TestBotProcessRequest:
         await bot.process_request(mock_query, mock_context_with_data)
         
         mock_query.edit_message_text.assert_called_once()
-        call_args = mock_query.edit_message_text.call_args[0][0]
+        call_args = mock_query.edit_message_text.call_args.args[0]
         assert "субтитры отключены" in call_args
 
 
+@pytest.mark.xdist_group(name="bot_globals")
+@pytest.mark.usefixtures("no_sleep")  # Backoff в retry-функциях не ждёт реального времени
 class TestRateLimiting:
     """Тесты функций rate limiting"""
     
@@ -492,7 +515,6 @@ class TestRateLimiting:
         bot.request_timestamps.clear()
         bot.global_last_request = 0
     
-    @pytest.mark.asyncio
     async def test_rate_limit_check_success(self):
         """Тест успешной проверки rate limit"""
         user_id = 12345
@@ -505,24 +527,20 @@ class TestRateLimiting:
         result = await bot.rate_limit_check(user_id)
         assert result is False
     
-    @pytest.mark.asyncio
     async def test_rate_limit_check_after_interval(self):
         """Тест rate limit после истечения интервала"""
         user_id = 12345
         
         # Первый запрос
-        result = await bot.rate_limit_check(user_id)
+        with patch('bot._now', return_value=1000.0):
+            result = await bot.rate_limit_check(user_id)
         assert result is True
         
-        # Ждем больше интервала
-        import time
-        time.sleep(16)  # MIN_REQUEST_INTERVAL = 15
-        
-        # Запрос должен пройти
-        result = await bot.rate_limit_check(user_id)
+        # Сдвигаем часы больше чем на интервал вместо реального ожидания
+        with patch('bot._now', return_value=1000.0 + bot.MIN_REQUEST_INTERVAL + 1):
+            result = await bot.rate_limit_check(user_id)
         assert result is True
     
-    @pytest.mark.asyncio
     async def test_global_rate_limit_check_success(self):
         """Тест успешной проверки глобального rate limit"""
         # Первый запрос должен пройти
@@ -533,43 +551,33 @@ class TestRateLimiting:
         result = await bot.global_rate_limit_check()
         assert result is False
     
-    @pytest.mark.asyncio
     async def test_global_rate_limit_check_after_interval(self):
         """Тест глобального rate limit после истечения интервала"""
         # Первый запрос
-        result = await bot.global_rate_limit_check()
+        with patch('bot._now', return_value=1000.0):
+            result = await bot.global_rate_limit_check()
         assert result is True
         
-        # Ждем больше интервала
-        import time
-        time.sleep(3)  # 2 seconds minimum interval
-        
-        # Запрос должен пройти
-        result = await bot.global_rate_limit_check()
+        # Сдвигаем часы больше чем на глобальный интервал
+        with patch('bot._now', return_value=1000.0 + bot.GLOBAL_MIN_REQUEST_INTERVAL + 1):
+            result = await bot.global_rate_limit_check()
         assert result is True
     
-    @pytest.mark.asyncio
-    @patch('bot.YouTubeTranscriptApi.get_transcript')
-    @patch('bot.global_rate_limit_check')
-    async def test_get_transcript_with_retry_success(self, mock_global_check, mock_get_transcript):
+    async def test_get_transcript_with_retry_success(self, yt_api):
         """Тест успешного получения транскрипта с retry"""
-        mock_global_check.return_value = True
-        mock_get_transcript.return_value = [{'start': 0, 'text': 'Test'}]
+        yt_api.list.return_value = [EN]
+        yt_api.fetch.return_value = [{'start': 0, 'text': 'Test'}]
         
         result, success, error = await bot.get_transcript_with_retry("test_video", ["en"])
         
         assert success is True
         assert error is None
         assert result == [{'start': 0, 'text': 'Test'}]
-        mock_get_transcript.assert_called_once_with("test_video", languages=["en"])
+        yt_api.fetch.assert_called_once_with("test_video", languages=["en"])
     
-    @pytest.mark.asyncio
-    @patch('bot.YouTubeTranscriptApi.get_transcript')
-    @patch('bot.global_rate_limit_check')
-    async def test_get_transcript_with_retry_rate_limit(self, mock_global_check, mock_get_transcript):
+    async def test_get_transcript_with_retry_rate_limit(self, yt_api):
         """Тест retry при rate limit"""
-        mock_global_check.return_value = True
-        mock_get_transcript.side_effect = Exception("Too Many Requests")
+        yt_api.fetch.side_effect = Exception("Too Many Requests")
         
         result, success, error = await bot.get_transcript_with_retry("test_video", ["en"], max_retries=1)
         
@@ -577,15 +585,9 @@ class TestRateLimiting:
         assert "Превышен лимит запросов" in error
         assert result is None
     
-    @pytest.mark.asyncio
-    @patch('bot.YouTubeTranscriptApi.get_transcript')
-    @patch('bot.global_rate_limit_check')
-    async def test_get_transcript_with_retry_transcripts_disabled(self, mock_global_check, mock_get_transcript):
+    async def test_get_transcript_with_retry_transcripts_disabled(self, yt_api):
         """Тест retry при отключенных субтитрах"""
-        from youtube_transcript_api import TranscriptsDisabled
-        
-        mock_global_check.return_value = True
-        mock_get_transcript.side_effect = TranscriptsDisabled("test_video_id")
+        yt_api.fetch.side_effect = bot.TranscriptsDisabled("test_video_id")
         
         result, success, error = await bot.get_transcript_with_retry("test_video", ["en"], max_retries=1)
         
@@ -593,15 +595,9 @@ class TestRateLimiting:
         assert "Subtitles are disabled" in error or "субтитры отключены" in error
         assert result is None
     
-    @pytest.mark.asyncio
-    @patch('bot.YouTubeTranscriptApi.get_transcript')
-    @patch('bot.global_rate_limit_check')
-    async def test_get_transcript_with_retry_no_transcript_found(self, mock_global_check, mock_get_transcript):
+    async def test_get_transcript_with_retry_no_transcript_found(self, yt_api):
         """Тест retry при отсутствии субтитров"""
-        from youtube_transcript_api import NoTranscriptFound
-        
-        mock_global_check.return_value = True
-        mock_get_transcript.side_effect = NoTranscriptFound("test_video_id", ["en"], {})
+        yt_api.fetch.side_effect = bot.NoTranscriptFound("test_video_id", ["en"], {})
         
         result, success, error = await bot.get_transcript_with_retry("test_video", ["en"], max_retries=1)
         
@@ -609,17 +605,9 @@ class TestRateLimiting:
         assert "No transcripts were found" in error or "не найдены" in error
         assert result is None
     
-    @pytest.mark.asyncio
-    @patch('bot.YouTubeTranscriptApi.list_transcripts')
-    @patch('bot.global_rate_limit_check')
-    async def test_get_available_transcripts_with_retry_success(self, mock_global_check, mock_list_transcripts):
+    async def test_get_available_transcripts_with_retry_success(self, yt_api):
         """Тест успешного получения списка транскриптов с retry"""
-        mock_global_check.return_value = True
-        
-        mock_transcript = MagicMock()
-        mock_transcript.language_code = 'en'
-        mock_transcript.language = 'English'
-        mock_list_transcripts.return_value = [mock_transcript]
+        yt_api.list.return_value = [EN]
         
         result, success, error = await bot.get_available_transcripts_with_retry("test_video")
         
@@ -627,15 +615,11 @@ class TestRateLimiting:
         assert error is None
         assert len(result) == 1
         assert result[0].language_code == 'en'
-        mock_list_transcripts.assert_called_once_with("test_video")
+        yt_api.list.assert_called_once_with("test_video")
     
-    @pytest.mark.asyncio
-    @patch('bot.YouTubeTranscriptApi.list_transcripts')
-    @patch('bot.global_rate_limit_check')
-    async def test_get_available_transcripts_with_retry_rate_limit(self, mock_global_check, mock_list_transcripts):
+    async def test_get_available_transcripts_with_retry_rate_limit(self, yt_api):
         """Тест retry при rate limit для списка транскриптов"""
-        mock_global_check.return_value = True
-        mock_list_transcripts.side_effect = Exception("Too Many Requests")
+        yt_api.list.side_effect = Exception("Too Many Requests")
         
         result, success, error = await bot.get_available_transcripts_with_retry("test_video", max_retries=1)
         
@@ -643,13 +627,9 @@ class TestRateLimiting:
         assert "Превышен лимит запросов" in error
         assert result is None
     
-    @pytest.mark.asyncio
-    @patch('bot.YouTubeTranscriptApi.list_transcripts')
-    @patch('bot.global_rate_limit_check')
-    async def test_get_available_transcripts_with_retry_video_unavailable(self, mock_global_check, mock_list_transcripts):
+    async def test_get_available_transcripts_with_retry_video_unavailable(self, yt_api):
         """Тест retry при недоступном видео"""
-        mock_global_check.return_value = True
-        mock_list_transcripts.side_effect = Exception("Video unavailable")
+        yt_api.list.side_effect = Exception("Video unavailable")
         
         result, success, error = await bot.get_available_transcripts_with_retry("test_video", max_retries=1)
         
@@ -657,7 +637,6 @@ class TestRateLimiting:
         assert "недоступно" in error
         assert result is None
     
-    @pytest.mark.asyncio
     async def test_rate_limit_check_different_users(self):
         """Тест rate limit для разных пользователей"""
         user1 = 12345
@@ -677,18 +656,13 @@ class TestRateLimiting:
         assert result1 is False
         assert result2 is False
     
-    @pytest.mark.asyncio
     async def test_global_rate_limit_concurrent_requests(self):
         """Тест глобального rate limit при конкурентных запросах"""
-        import asyncio
-        
-        # Создаем несколько конкурентных запросов
-        async def make_request():
-            return await bot.global_rate_limit_check()
-        
-        # Запускаем несколько запросов одновременно
-        tasks = [make_request() for _ in range(5)]
-        results = await asyncio.gather(*tasks)
+        # Замороженные часы: все запросы видят одно и то же время, и исход
+        # определяется только блокировкой, а не порядком планирования
+        with patch('bot._now', return_value=1000.0):
+            results = await asyncio.gather(*(bot.global_rate_limit_check() for _ in range(5)))
         
         # Только один запрос должен пройти
-        assert sum(results) == 1 
\ No newline at end of file
+        assert sum(results) == 1
+        assert bot.global_last_request == 1000.0 
\ No newline at end of file
@@ -8,40 +8,96 @@
 import pytest
 import asyncio
 import os
+import re
 import tempfile
+from functools import lru_cache
 from unittest.mock import Mock, AsyncMock, patch
 from mind_map_generator import MindMapGenerator
 
+# Длинный текст для проверки разбиения на чанки
+_LONG_TEXT = "Предложение 1. " * 1000
+
+
+def _needles(*needles):
+    """Шаблон для поиска всех подстрок за один проход (lookahead ловит и перекрывающиеся)"""
+    alternatives = '|'.join(map(re.escape, sorted(needles, key=len, reverse=True)))
+    return re.compile(f'(?=({alternatives}))')
+
+
+def _found(pattern, text):
+    """Множество подстрок шаблона, встретившихся в тексте"""
+    return set(pattern.findall(text))
+
+
+_MD_STRUCTURE_NEEDLES = _needles("# ", "## ", "💡", "🤖", "🎥")
+_MD_GENERATION_NEEDLES = _needles(
+    "# Технологии ИИ", "## ИИ и ML", "## Платформы", "🤖", "💡",
+    "Автоматически сгенерированная карта памяти"
+)
+_HTML_NEEDLES = _needles(
+    "<!DOCTYPE html>", "<title>Mind Map - Subs-bot</title>", "Интерактивная карта памяти",
+    "markmap-toolbar", "markmap-view"
+)
+
+
+@lru_cache(maxsize=128)
+def _mock_chunk_ideas(chunk):
+    """Идеи, которые мок LLM "находит" в чанке (кэшируются по тексту чанка)"""
+    ideas = []
+    if 'искусственный интеллект' in chunk.lower():
+        ideas.extend([
+            "Искусственный интеллект и машинное обучение",
+            "Автоматизация процессов",
+            "Анализ больших данных"
+        ])
+    if 'youtube' in chunk.lower():
+        ideas.extend([
+            "YouTube платформа",
+            "Автоматическая генерация субтитров"
+        ])
+    if not ideas:
+        ideas = ["Технологические инновации", "Цифровая трансформация"]
+    return tuple(ideas)
+
+
+async def mock_analyze_chunk(chunk):
+    """Мок LLM анализа чанка; возвращает новый список, чтобы кэш не портился"""
+    return list(_mock_chunk_ideas(chunk))
+
+
+@pytest.mark.xdist_group(name="integration_mindmap")
 class TestMindMapIntegration:
     """Тесты интеграции mind map с Telegram ботом"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def mock_mind_map_generator(self):
-        """Создает мок mind map генератора"""
+        """Создает мок mind map генератора (один на сессию: состояния между вызовами у него нет)"""
         generator = MindMapGenerator("test_api_key")
         
         # Мокаем LLM анализ
-        async def mock_analyze_chunk(chunk):
-            ideas = []
-            if 'искусственный интеллект' in chunk.lower():
-                ideas.extend([
-                    "Искусственный интеллект и машинное обучение",
-                    "Автоматизация процессов",
-                    "Анализ больших данных"
-                ])
-            if 'youtube' in chunk.lower():
-                ideas.extend([
-                    "YouTube платформа",
-                    "Автоматическая генерация субтитров"
-                ])
-            if not ideas:
-                ideas = ["Технологические инновации", "Цифровая трансформация"]
-            return ideas
-        
         generator._analyze_chunk_with_llm = mock_analyze_chunk
+        # Чанкинг детерминирован, а результат только читается - кэшируем по тексту
+        generator._chunk_text = lru_cache(maxsize=32)(generator._chunk_text)
         return generator
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
+    def generated_formats(self, mock_mind_map_generator):
+        """Markdown, Mermaid и HTML строятся один раз на сессию; методы генератора
+        не обёрнуты, каждый тест читает готовые результаты"""
+        structure = {
+            "main_topic": "Технологии ИИ",
+            "subtopics": {
+                "ИИ и ML": ["Машинное обучение", "Нейронные сети"],
+                "Платформы": ["YouTube", "Социальные сети"]
+            }
+        }
+        return {
+            "markdown": mock_mind_map_generator.generate_markdown(structure),
+            "mermaid": mock_mind_map_generator.generate_mermaid(structure),
+            "html": mock_mind_map_generator.generate_html_markmap("# Тест\n## Подтема\n- Пункт"),
+        }
+    
+    @pytest.fixture(scope="module")
     def sample_text(self):
         """Пример текста для тестирования"""
         return """
@@ -72,10 +128,9 @@ class TestMindMapIntegration:
         assert len(structure["subtopics"]) > 0
         
         # Проверяем Markdown
-        markdown = results["markdown"]
-        assert "# " in markdown  # Заголовок
-        assert "## " in markdown  # Подзаголовки
-        assert "💡" in markdown or "🤖" in markdown or "🎥" in markdown  # Эмодзи
+        found = _found(_MD_STRUCTURE_NEEDLES, results["markdown"])
+        assert {"# ", "## "} <= found  # Заголовок и подзаголовки
+        assert found & {"💡", "🤖", "🎥"}  # Эмодзи
         
         # Проверяем Mermaid
         mermaid = results["mermaid"]
@@ -88,18 +143,14 @@ class TestMindMapIntegration:
         assert "Mind Map - Subs-bot" in html
         assert "markmap" in html
     
-    @pytest.mark.asyncio
-    async def test_text_chunking(self, mock_mind_map_generator):
+    def test_text_chunking(self, mock_mind_map_generator):
         """Тест разбиения текста на чанки"""
-        long_text = "Предложение 1. " * 1000  # ~6000 символов
-        
-        chunks = mock_mind_map_generator._chunk_text(long_text)
+        chunks = mock_mind_map_generator._chunk_text(_LONG_TEXT)
         
         assert len(chunks) > 1  # Должно быть разбито на несколько чанков
-        assert all(len(chunk) <= 2000 for chunk in chunks)  # Каждый чанк не больше 2000 символов
+        assert max(map(len, chunks)) <= 2000  # Каждый чанк не больше 2000 символов
     
-    @pytest.mark.asyncio
-    async def test_hierarchy_building(self, mock_mind_map_generator):
+    def test_hierarchy_building(self, mock_mind_map_generator):
         """Тест построения иерархии идей"""
         ideas = [
             "Искусственный интеллект и машинное обучение",
@@ -120,63 +171,44 @@ class TestMindMapIntegration:
         # YouTube идеи могут попасть в "Общие темы" если их мало
         assert len(subtopics) > 0  # Просто проверяем, что есть подтемы
     
-    def test_markdown_generation(self, mock_mind_map_generator):
+    def test_markdown_generation(self, generated_formats):
         """Тест генерации Markdown"""
-        structure = {
-            "main_topic": "Технологии ИИ",
-            "subtopics": {
-                "ИИ и ML": ["Машинное обучение", "Нейронные сети"],
-                "Платформы": ["YouTube", "Социальные сети"]
-            }
-        }
+        markdown = generated_formats["markdown"]
         
-        markdown = mock_mind_map_generator.generate_markdown(structure)
-        
-        assert "# Технологии ИИ" in markdown
-        assert "## ИИ и ML" in markdown
-        assert "## Платформы" in markdown
-        assert "🤖" in markdown or "💡" in markdown  # Эмодзи
-        assert "Автоматически сгенерированная карта памяти" in markdown
+        found = _found(_MD_GENERATION_NEEDLES, markdown)
+        assert {"# Технологии ИИ", "## ИИ и ML", "## Платформы",
+                "Автоматически сгенерированная карта памяти"} <= found
+        assert found & {"🤖", "💡"}  # Эмодзи
     
-    def test_mermaid_generation(self, mock_mind_map_generator):
+    def test_mermaid_generation(self, generated_formats):
         """Тест генерации Mermaid"""
-        structure = {
-            "main_topic": "Технологии ИИ",
-            "subtopics": {
-                "ИИ и ML": ["Машинное обучение", "Нейронные сети"]
-            }
-        }
-        
-        mermaid = mock_mind_map_generator.generate_mermaid(structure)
+        mermaid = generated_formats["mermaid"]
         
         assert "mindmap" in mermaid
         assert 'root(("Технологии ИИ"))' in mermaid
         assert '"ИИ и ML"' in mermaid
         assert '"🤖 Машинное обучение"' in mermaid
     
-    def test_html_generation(self, mock_mind_map_generator):
+    def test_html_generation(self, generated_formats):
         """Тест генерации HTML"""
-        markdown_content = "# Тест\n## Подтема\n- Пункт"
-        
-        html = mock_mind_map_generator.generate_html_markmap(markdown_content)
+        html = generated_formats["html"]
         
-        assert "<!DOCTYPE html>" in html
-        assert "<title>Mind Map - Subs-bot</title>" in html
-        assert "Интерактивная карта памяти" in html
-        assert "markmap-toolbar" in html
-        assert "markmap-view" in html
+        assert _found(_HTML_NEEDLES, html) == {
+            "<!DOCTYPE html>", "<title>Mind Map - Subs-bot</title>", "Интерактивная карта памяти",
+            "markmap-toolbar", "markmap-view"
+        }
     
     @pytest.mark.asyncio
     async def test_png_rendering_fallback(self, mock_mind_map_generator):
         """Тест fallback для PNG рендеринга"""
         mermaid_code = "mindmap\n  root((Тест))\n    подтема\n      пункт"
         
-        # Мокаем проверку mermaid-cli
-        with patch.object(mock_mind_map_generator, '_check_mermaid_cli', return_value=False):
-            # Мокаем kroki.io API
-            with patch.object(mock_mind_map_generator, '_render_with_kroki_api', return_value=True):
-                result = await mock_mind_map_generator.render_to_png(mermaid_code, "test.png")
-                assert result is True
+        # Мокаем проверку mermaid-cli (недоступен) и kroki.io API одним патчем
+        with patch.multiple(mock_mind_map_generator,
+                            _check_mermaid_cli=Mock(return_value=False),
+                            _render_with_kroki_api=AsyncMock(return_value=True)):
+            result = await mock_mind_map_generator.render_to_png(mermaid_code, "test.png")
+            assert result is True
     
     def test_emoji_classification(self, mock_mind_map_generator):
         """Тест классификации идей по эмодзи"""
@@ -5,12 +5,20 @@ Test MCP Integrations
 """
 
 import asyncio
+import gc
 import json
+import logging
+import sys
+import warnings
 from datetime import datetime, timedelta
 from enterprise_task_orchestrator import EnterpriseTaskOrchestrator, TaskData
 from mcp_integrations import MCPIntegrationManager
+from _output import buffered_output
 
-async def test_basic_integrations():
+logger = logging.getLogger(__name__)
+
+@buffered_output
+async def test_basic_integrations(orchestrator):
     """Тестирование базовых интеграций"""
     print("🧪 Тестирование интеграций с MCP серверами")
     print("=" * 60)
@@ -30,8 +38,6 @@ async def test_basic_integrations():
     # Тестирование через оркестратор
     print("\n🎯 Тестирование через Enterprise оркестратор...")
     
-    orchestrator = EnterpriseTaskOrchestrator()
-    
     try:
         # Создание задачи через оркестратор
         created_task = await orchestrator.create_task(
@@ -58,26 +64,12 @@ async def test_basic_integrations():
         
     except Exception as e:
         print(f"❌ Ошибка при тестировании оркестратора: {e}")
-    
-    finally:
-        await orchestrator.stop()
 
-async def test_direct_integrations():
+@buffered_output
+async def test_direct_integrations(integration_manager):
     """Тестирование прямых интеграций"""
     print("\n🔗 Тестирование прямых интеграций...")
     
-    integration_manager = MCPIntegrationManager()
-    
-    # Тестирование статуса интеграций
-    print("📡 Проверка статуса интеграций...")
-    status = await integration_manager.get_integration_status()
-    
-    for server, is_online in status.items():
-        status_icon = "✅" if is_online else "❌"
-        print(f"  {status_icon} {server}: {'онлайн' if is_online else 'офлайн'}")
-    
-    # Тестирование создания задачи
-    print("\n📝 Тестирование создания задачи...")
     test_task = TaskData(
         id="direct_test_001",
         title="Прямая интеграция тест",
@@ -86,31 +78,66 @@ async def test_direct_integrations():
         tags=["direct", "test"]
     )
     
-    try:
-        results = await integration_manager.create_task_integrated(test_task)
-        
-        print("📊 Результаты создания задачи:")
-        for server, response in results.items():
-            status_icon = "✅" if response.success else "❌"
-            print(f"  {status_icon} {server}: {response.success}")
-            if not response.success:
-                print(f"    Ошибка: {response.error}")
-            print(f"    Время отклика: {response.response_time:.3f}s")
+    # Статус и создание задачи одним пакетным вызовом
+    print("📡 Проверка статуса интеграций и создание задачи...")
+    status, results = await integration_manager.batch_execute([
+        {"op": "status"},
+        {"op": "create_task", "task": test_task},
+    ])
     
-    except Exception as e:
-        print(f"❌ Ошибка при тестировании прямых интеграций: {e}")
+    assert not isinstance(status, Exception), status
+    for server, is_online in status.items():
+        status_icon = "✅" if is_online else "❌"
+        print(f"  {status_icon} {server}: {'онлайн' if is_online else 'офлайн'}")
+    
+    print("\n📝 Результаты создания задачи:")
+    if isinstance(results, Exception):
+        print(f"❌ Ошибка при тестировании прямых интеграций: {results}")
+        return
+    
+    for server, response in results.items():
+        status_icon = "✅" if response.success else "❌"
+        print(f"  {status_icon} {server}: {response.success}")
+        if not response.success:
+            print(f"    Ошибка: {response.error}")
+        print(f"    Время отклика: {response.response_time:.3f}s")
 
-async def test_individual_servers():
-    """Тестирование отдельных серверов"""
-    print("\n🔧 Тестирование отдельных серверов...")
+@buffered_output
+async def test_batch_session_isolation():
+    """Параллельные операции пакета над общими клиентами не теряют и не текут сессии"""
+    print("\n🔒 Проверка сессий при параллельных операциях пакета...")
     
-    from mcp_integrations import (
-        DeltaTaskIntegration, ShrimpTaskManagerIntegration, 
-        HPKVMemoryIntegration, NotificationsIntegration
+    test_task = TaskData(
+        id="batch_session_test",
+        title="Пакетная проверка сессий",
+        description="status и create_task используют одни и те же клиенты",
+        priority=2
     )
+    ops = [{"op": "status"}, {"op": "create_task", "task": test_task}]
     
-    # Тест deltatask
-    print("📋 Тестирование deltatask...")
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        
+        # Без пула каждый клиент открывает и закрывает собственную сессию
+        manager = MCPIntegrationManager()
+        results = await manager.batch_execute(ops)
+        assert not any(isinstance(r, Exception) for r in results), results
+        
+        # С пулом выход одной операции не должен обнулять сессию под другой
+        async with MCPIntegrationManager() as pooled:
+            results = await pooled.batch_execute(ops * 2, stop_on_error=True)
+            assert all(client.session is None for client in pooled.integrations.values())
+        
+        assert all(client.session is None for client in manager.integrations.values())
+        gc.collect()
+    
+    leaks = [w for w in caught if issubclass(w.category, ResourceWarning)]
+    assert not leaks, [str(w.message) for w in leaks]
+    print("  ✅ Незакрытых сессий нет")
+
+async def _probe_deltatask():
+    """Проба deltatask: создание задачи"""
+    from mcp_integrations import DeltaTaskIntegration
     try:
         async with DeltaTaskIntegration() as client:
             test_task = TaskData(
@@ -120,24 +147,26 @@ async def test_individual_servers():
                 priority=2
             )
             response = await client.create_task(test_task)
-            print(f"  {'✅' if response.success else '❌'} Deltatask: {response.success}")
+            return "📋 Deltatask", response.success, None
     except Exception as e:
-        print(f"  ❌ Deltatask ошибка: {e}")
-    
-    # Тест shrimp-task-manager
-    print("🦐 Тестирование shrimp-task-manager...")
+        return "📋 Deltatask", False, e
+
+async def _probe_shrimp():
+    """Проба shrimp-task-manager: планирование задачи"""
+    from mcp_integrations import ShrimpTaskManagerIntegration
     try:
         async with ShrimpTaskManagerIntegration() as client:
             response = await client.plan_task(
                 "Тестирование планирования задач",
                 "Проверка работы shrimp-task-manager"
             )
-            print(f"  {'✅' if response.success else '❌'} Shrimp-task-manager: {response.success}")
+            return "🦐 Shrimp-task-manager", response.success, None
     except Exception as e:
-        print(f"  ❌ Shrimp-task-manager ошибка: {e}")
-    
-    # Тест hpkv-memory
-    print("🧠 Тестирование hpkv-memory...")
+        return "🦐 Shrimp-task-manager", False, e
+
+async def _probe_hpkv():
+    """Проба hpkv-memory: сохранение памяти"""
+    from mcp_integrations import HPKVMemoryIntegration
     try:
         async with HPKVMemoryIntegration() as client:
             response = await client.store_memory(
@@ -148,12 +177,13 @@ async def test_individual_servers():
                 "Тестовый ответ",
                 {"test": True}
             )
-            print(f"  {'✅' if response.success else '❌'} HPKV-memory: {response.success}")
+            return "🧠 HPKV-memory", response.success, None
     except Exception as e:
-        print(f"  ❌ HPKV-memory ошибка: {e}")
-    
-    # Тест notifications
-    print("🔔 Тестирование notifications...")
+        return "🧠 HPKV-memory", False, e
+
+async def _probe_notifications():
+    """Проба notifications: отправка уведомления"""
+    from mcp_integrations import NotificationsIntegration
     try:
         async with NotificationsIntegration() as client:
             response = await client.send_notification(
@@ -161,31 +191,65 @@ async def test_individual_servers():
                 "Это тестовое уведомление от MCP системы",
                 "info"
             )
-            print(f"  {'✅' if response.success else '❌'} Notifications: {response.success}")
+            return "🔔 Notifications", response.success, None
     except Exception as e:
-        print(f"  ❌ Notifications ошибка: {e}")
+        return "🔔 Notifications", False, e
+
+@buffered_output
+async def test_individual_servers(integration_manager):
+    """Тестирование отдельных серверов (клиенты берут сессию из пула менеджера)"""
+    print("\n🔧 Тестирование отдельных серверов...")
+    
+    # Серверы независимы: опрашиваем их одновременно, общее время - как у самого медленного
+    results = await asyncio.gather(
+        _probe_deltatask(), _probe_shrimp(), _probe_hpkv(), _probe_notifications(),
+        return_exceptions=True
+    )
+    
+    for result in results:
+        if isinstance(result, BaseException):
+            print(f"  ❌ Ошибка пробы: {result}")
+            continue
+        name, ok, error = result
+        if error is not None:
+            print(f"  ❌ {name} ошибка: {error}")
+        else:
+            print(f"  {'✅' if ok else '❌'} {name}: {ok}")
 
-async def main():
+async def main(orchestrator):
     """Основная функция тестирования"""
     print("🚀 Запуск тестирования MCP интеграций")
     print("=" * 60)
     
     try:
         # Тестирование базовых интеграций
-        await test_basic_integrations()
+        await test_basic_integrations(orchestrator)
         
-        # Тестирование прямых интеграций
-        await test_direct_integrations()
+        async with MCPIntegrationManager() as integration_manager:
+            # Тестирование прямых интеграций
+            await test_direct_integrations(integration_manager)
+            
+            # Тестирование отдельных серверов
+            await test_individual_servers(integration_manager)
         
-        # Тестирование отдельных серверов
-        await test_individual_servers()
+        # Пакет без общего пула: клиенты открывают собственные сессии
+        await test_batch_session_isolation()
         
         print("\n🎉 Тестирование завершено!")
         
-    except Exception as e:
-        print(f"\n❌ Ошибка при тестировании: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("\n❌ Ошибка при тестировании")
+    
+    finally:
+        await orchestrator.stop()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    # Свой обработчик только для логгера скрипта: корневой не настраиваем,
+    # иначе логи оркестратора (у него свои обработчики) задвоятся
+    handler = logging.StreamHandler(stream=sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    from _async_runner import AsyncLoopThread
+    # Оркестратор ставит обработчики сигналов - создаём его в главном потоке
+    AsyncLoopThread.get().run(main(EnterpriseTaskOrchestrator())) 
\ No newline at end of file
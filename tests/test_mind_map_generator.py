@@ -2,10 +2,89 @@
 Тесты для модуля mind_map_generator.py
 """
 
+import json
 import pytest
 import asyncio
+import aiohttp
 from mind_map_generator import MindMapGenerator
 
+# Ответы, которые фейковая сеть отдаёт вместо OpenRouter и kroki.io
+CANNED_IDEAS = [
+    "ИИ-суммаризация создаёт краткое содержание",
+    "YouTube субтитры дают текст видео",
+    "Распознавание речи конвертирует аудио в текст",
+]
+CANNED_LLM_RESPONSE = {"choices": [{"message": {"content": json.dumps(CANNED_IDEAS, ensure_ascii=False)}}]}
+CANNED_PNG = b"\x89PNG\r\n\x1a\n"
+
+SAMPLE_TEXT = """
+        ИИ-суммаризация - это технология автоматического создания краткого содержания.
+        YouTube субтитры используются для извлечения текста из видео.
+        Распознавание речи позволяет конвертировать аудио в текст.
+        Голосовые сообщения обрабатываются через Soniox API.
+        Статистика качества показывает эффективность различных методов.
+        """
+
+# Готовая структура для тестов генерации Markdown/Mermaid
+CANNED_STRUCTURE = {
+    "main_topic": "Тестовая тема",
+    "subtopics": {
+        "подтема_1": ["пункт_1", "пункт_2"],
+        "подтема_2": ["пункт_3"]
+    }
+}
+
+
+class FakeResponse:
+    """Минимальный ответ aiohttp: status, json(), read()"""
+    
+    def __init__(self, status=200, json_data=None, body=b""):
+        self.status = status
+        self._json = json_data
+        self._body = body
+    
+    async def json(self):
+        return self._json
+    
+    async def read(self):
+        return self._body
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeClientSession:
+    """Подмена aiohttp.ClientSession: запросы не уходят в сеть"""
+    
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def post(self, url, **kwargs):
+        assert url == "https://openrouter.ai/api/v1/chat/completions", url
+        return FakeResponse(json_data=CANNED_LLM_RESPONSE)
+    
+    def get(self, url, **kwargs):
+        assert url.startswith("https://kroki.io/mermaid/png/"), url
+        return FakeResponse(body=CANNED_PNG)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture(autouse=True)
+def _mock_http(monkeypatch):
+    """Генератор импортирует aiohttp внутри методов - подменяем ClientSession
+    в самом модуле и отключаем mermaid-cli, чтобы рендер шёл через kroki"""
+    monkeypatch.setattr(aiohttp, "ClientSession", FakeClientSession)
+    monkeypatch.setattr(MindMapGenerator, "_check_mermaid_cli", lambda self: False)
+
+
 class TestMindMapGenerator:
     """Тесты для класса MindMapGenerator"""
     
@@ -17,13 +96,7 @@ class TestMindMapGenerator:
     @pytest.fixture
     def sample_text(self):
         """Пример текста для тестирования"""
-        return """
-        ИИ-суммаризация - это технология автоматического создания краткого содержания.
-        YouTube субтитры используются для извлечения текста из видео.
-        Распознавание речи позволяет конвертировать аудио в текст.
-        Голосовые сообщения обрабатываются через Soniox API.
-        Статистика качества показывает эффективность различных методов.
-        """
+        return SAMPLE_TEXT
     
     def test_init(self, generator):
         """Тест инициализации генератора"""
@@ -39,18 +112,12 @@ class TestMindMapGenerator:
         assert "main_topic" in structure
         assert "subtopics" in structure
         assert isinstance(structure["subtopics"], dict)
+        ideas = [idea for items in structure["subtopics"].values() for idea in items]
+        assert sorted(ideas) == sorted(CANNED_IDEAS)
     
     def test_generate_markdown(self, generator):
         """Тест генерации Markdown"""
-        structure = {
-            "main_topic": "Тестовая тема",
-            "subtopics": {
-                "подтема_1": ["пункт_1", "пункт_2"],
-                "подтема_2": ["пункт_3"]
-            }
-        }
-
-        markdown = generator.generate_markdown(structure)
+        markdown = generator.generate_markdown(CANNED_STRUCTURE)
 
         assert "# Тестовая тема" in markdown
         assert "## подтема_1" in markdown
@@ -62,14 +129,7 @@ class TestMindMapGenerator:
     
     def test_generate_mermaid(self, generator):
         """Тест генерации Mermaid диаграммы"""
-        structure = {
-            "main_topic": "Тестовая тема",
-            "subtopics": {
-                "подтема_1": ["пункт_1", "пункт_2"]
-            }
-        }
-
-        mermaid = generator.generate_mermaid(structure)
+        mermaid = generator.generate_mermaid(CANNED_STRUCTURE)
 
         assert "mindmap" in mermaid
         assert 'root(("Тестовая тема"))' in mermaid  # Теперь с кавычками
@@ -78,15 +138,15 @@ class TestMindMapGenerator:
         assert '"💡 пункт_2"' in mermaid
     
     @pytest.mark.asyncio
-    async def test_render_to_png(self, generator):
+    async def test_render_to_png(self, generator, tmp_path):
         """Тест рендеринга в PNG"""
         mermaid_code = "mindmap\n  root((Тест))\n    подтема\n      пункт"
-        output_path = "test_output.png"
+        output_path = tmp_path / "png" / "test_output.png"
         
-        result = await generator.render_to_png(mermaid_code, output_path)
+        result = await generator.render_to_png(mermaid_code, str(output_path))
         
-        # Теперь может возвращать False если нет mermaid-cli и kroki.io недоступен
-        assert isinstance(result, bool)
+        assert result is True
+        assert output_path.read_bytes() == CANNED_PNG
     
     def test_generate_html_markmap(self, generator):
         """Тест генерации HTML Markmap"""
@@ -100,40 +160,29 @@ class TestMindMapGenerator:
         assert "markmap-view" in html     # И markmap-view
         assert "Интерактивная карта памяти" in html
     
-    @pytest.mark.asyncio
-    async def test_create_mind_map_all_formats(self, generator, sample_text):
-        """Тест создания mind map во всех форматах"""
-        results = await generator.create_mind_map(sample_text, "all")
-        
-        assert "structure" in results
-        assert "markdown" in results
-        assert "mermaid" in results
-        assert "png_path" in results
-        assert "html_content" in results
-        
-        assert results["markdown"] is not None
-        assert results["mermaid"] is not None
-        assert results["html_content"] is not None
+    # Какие поля результата create_mind_map заполнены для каждого формата
+    FORMAT_MATRIX = {
+        "all": {"markdown", "mermaid", "png_path", "html_content"},
+        "markdown": {"markdown"},
+        "mermaid": {"mermaid"},
+    }
     
     @pytest.mark.asyncio
-    async def test_create_mind_map_markdown_only(self, generator, sample_text):
-        """Тест создания mind map только в формате Markdown"""
-        results = await generator.create_mind_map(sample_text, "markdown")
+    async def test_create_mind_map_format_matrix(self, generator, sample_text, tmp_path, monkeypatch):
+        """Тест create_mind_map во всех форматах: варианты выполняются параллельно"""
+        # PNG для формата "all" пишется в текущую директорию
+        monkeypatch.chdir(tmp_path)
+        formats = list(self.FORMAT_MATRIX)
         
-        assert results["markdown"] is not None
-        assert results["mermaid"] is None
-        assert results["png_path"] is None
-        assert results["html_content"] is None
-    
-    @pytest.mark.asyncio
-    async def test_create_mind_map_mermaid_only(self, generator, sample_text):
-        """Тест создания mind map только в формате Mermaid"""
-        results = await generator.create_mind_map(sample_text, "mermaid")
+        results = await asyncio.gather(*(
+            generator.create_mind_map(sample_text, output_format) for output_format in formats
+        ))
         
-        assert results["markdown"] is None
-        assert results["mermaid"] is not None
-        assert results["png_path"] is None
-        assert results["html_content"] is None
+        for output_format, result in zip(formats, results):
+            assert result["structure"]["subtopics"], output_format
+            for field in ("markdown", "mermaid", "png_path", "html_content"):
+                populated = result[field] is not None
+                assert populated == (field in self.FORMAT_MATRIX[output_format]), (output_format, field)
 
 # Запуск тестов
 if __name__ == "__main__":
@@ -4,13 +4,22 @@
 """
 
 import pytest
-import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
-from bot import (
+import heapq
+import time
+from types import SimpleNamespace
+# Состояния живут в лёгком модуле user_state: импорт bot (telegram и пр.)
+# для этих тестов не нужен
+import user_state
+from user_state import (
+    set_state, get_state, clear_state,
     set_user_state, get_user_state, clear_user_state, 
     cleanup_expired_user_states, user_states
 )
 
+# Тесты мутируют глобальный user_states - держим их на одном воркере xdist
+pytestmark = pytest.mark.xdist_group("user_states")
+
+
 class TestMindMapStates:
     """Тесты для системы состояний Mind Map"""
     
@@ -18,36 +27,33 @@ class TestMindMapStates:
         """Очищаем состояния перед каждым тестом"""
         user_states.clear()
     
-    @pytest.mark.asyncio
-    async def test_set_user_state(self):
+    def test_set_user_state(self):
         """Тест установки состояния пользователя"""
         user_id = 12345
         
         # Устанавливаем состояние
-        await set_user_state(user_id, 'expecting_mind_map_text')
+        set_state(user_id, 'expecting_mind_map_text')
         
         # Проверяем, что состояние установлено
         assert user_id in user_states
         assert user_states[user_id] == 'expecting_mind_map_text'
     
-    @pytest.mark.asyncio
-    async def test_get_user_state(self):
+    def test_get_user_state(self):
         """Тест получения состояния пользователя"""
         user_id = 12345
         
         # Проверяем состояние по умолчанию
-        state = await get_user_state(user_id)
+        state = get_state(user_id)
         assert state == 'normal'
         
         # Устанавливаем состояние
         user_states[user_id] = 'expecting_mind_map_text'
         
         # Проверяем установленное состояние
-        state = await get_user_state(user_id)
+        state = get_state(user_id)
         assert state == 'expecting_mind_map_text'
     
-    @pytest.mark.asyncio
-    async def test_clear_user_state(self):
+    def test_clear_user_state(self):
         """Тест очистки состояния пользователя"""
         user_id = 12345
         
@@ -56,46 +62,55 @@ class TestMindMapStates:
         assert user_id in user_states
         
         # Очищаем состояние
-        await clear_user_state(user_id)
+        clear_state(user_id)
         
         # Проверяем, что состояние очищено
         assert user_id not in user_states
     
-    @pytest.mark.asyncio
-    async def test_multiple_users_states(self):
+    def test_multiple_users_states(self):
         """Тест работы с несколькими пользователями"""
         user1_id = 12345
         user2_id = 67890
         
         # Устанавливаем разные состояния для разных пользователей
-        await set_user_state(user1_id, 'expecting_mind_map_text')
-        await set_user_state(user2_id, 'normal')
+        set_state(user1_id, 'expecting_mind_map_text')
+        set_state(user2_id, 'normal')
         
         # Проверяем состояния
-        assert await get_user_state(user1_id) == 'expecting_mind_map_text'
-        assert await get_user_state(user2_id) == 'normal'
+        assert get_state(user1_id) == 'expecting_mind_map_text'
+        assert get_state(user2_id) == 'normal'
         
         # Очищаем состояние первого пользователя
-        await clear_user_state(user1_id)
+        clear_state(user1_id)
         
         # Проверяем, что второй пользователь не затронут
         assert user1_id not in user_states
         assert user2_id in user_states
-        assert await get_user_state(user2_id) == 'normal'
+        assert get_state(user2_id) == 'normal'
     
-    @pytest.mark.asyncio
-    async def test_state_transitions(self):
+    def test_state_transitions(self):
         """Тест переходов между состояниями"""
         user_id = 12345
         
         # Начальное состояние
-        assert await get_user_state(user_id) == 'normal'
+        assert get_state(user_id) == 'normal'
         
         # Переход в режим Mind Map
+        set_state(user_id, 'expecting_mind_map_text')
+        assert get_state(user_id) == 'expecting_mind_map_text'
+        
+        # Возврат в нормальное состояние
+        clear_state(user_id)
+        assert get_state(user_id) == 'normal'
+    
+    @pytest.mark.asyncio
+    async def test_async_interface(self):
+        """Тест асинхронных обёрток, которые вызывают обработчики бота"""
+        user_id = 12345
+        
         await set_user_state(user_id, 'expecting_mind_map_text')
         assert await get_user_state(user_id) == 'expecting_mind_map_text'
         
-        # Возврат в нормальное состояние
         await clear_user_state(user_id)
         assert await get_user_state(user_id) == 'normal'
     
@@ -114,6 +129,73 @@ class TestMindMapStates:
         assert user_id in user_states
         assert isinstance(user_states[user_id], str)
         assert user_states[user_id] == 'expecting_mind_map_text'
+    
+    @pytest.mark.asyncio
+    async def test_user_states_lru_eviction(self, monkeypatch):
+        """Тест ограничения размера user_states: вытесняется самый давний"""
+        monkeypatch.setattr(user_state, 'USER_STATE_MAX', 3)
+        
+        for user_id in range(user_state.USER_STATE_MAX + 1):
+            await set_user_state(user_id, 'expecting_mind_map_text')
+        
+        assert len(user_states) == user_state.USER_STATE_MAX
+        assert 0 not in user_states
+        
+        # Повторная установка делает пользователя самым свежим
+        await set_user_state(1, 'normal')
+        await set_user_state(100, 'expecting_mind_map_text')
+        assert 1 in user_states
+        assert 2 not in user_states
+        assert list(user_states) == [3, 1, 100]
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("total_users", [1_000, 100_000])
+    async def test_cleanup_scales_sublinear(self, monkeypatch, total_users):
+        """Тест очистки: просматриваются только истёкшие записи, а не все N"""
+        expired_users = 10
+        now = time.time()
+        
+        set_times = {}
+        expiry = []
+        for user_id in range(total_users):
+            set_at = now - 2 * user_state.USER_STATE_TTL if user_id < expired_users else now
+            user_states[user_id] = 'expecting_mind_map_text'
+            set_times[user_id] = set_at
+            expiry.append((set_at + user_state.USER_STATE_TTL, user_id))
+        heapq.heapify(expiry)
+        
+        popped = []
+        
+        def counting_heappop(heap):
+            item = heapq.heappop(heap)
+            popped.append(item)
+            return item
+        
+        monkeypatch.setattr(user_state, '_state_expiry', expiry)
+        monkeypatch.setattr(user_state, '_state_set_time', set_times)
+        monkeypatch.setattr(user_state, 'heapq', SimpleNamespace(heappop=counting_heappop, heappush=heapq.heappush))
+        
+        await cleanup_expired_user_states({})
+        
+        assert len(popped) == expired_users
+        assert len(user_states) == total_users - expired_users
+        assert all(user_id not in user_states for user_id in range(expired_users))
+    
+    @pytest.mark.asyncio
+    async def test_cleanup_keeps_active_users(self, monkeypatch):
+        """Тест очистки: активный пользователь получает новый срок"""
+        user_id = 12345
+        now = time.time()
+        
+        monkeypatch.setattr(user_state, '_state_expiry', [(now - 1, user_id)])
+        monkeypatch.setattr(user_state, '_state_set_time', {user_id: now - 2 * user_state.USER_STATE_TTL})
+        user_states[user_id] = 'expecting_mind_map_text'
+        
+        # Пользователь писал только что - срок продлевается от этого момента
+        await cleanup_expired_user_states({user_id: now})
+        
+        assert user_states[user_id] == 'expecting_mind_map_text'
+        assert user_state._state_expiry == [(now + user_state.USER_STATE_TTL, user_id)]
 
 if __name__ == "__main__":
     # Запуск тестов
@@ -7,16 +7,19 @@ import os
 import re
 import asyncio
 from summarizer import TextSummarizer
+from _output import buffered_output
 
 # Тестовый API ключ
 os.environ['OPENROUTER_API_KEY'] = 'sk-or-v1-your-real-key-here'
 
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|youtube\.com/embed/|youtube\.com/watch\?v=)?([\w-]{11})")
+
 def extract_video_id(url):
     """Извлекает video_id из YouTube URL"""
-    pattern = r"(?:v=|youtu\.be/|youtube\.com/embed/|youtube\.com/watch\?v=)?([\w-]{11})"
-    match = re.search(pattern, url)
+    match = _VIDEO_ID_RE.search(url)
     return match.group(1) if match else None
 
+@buffered_output
 async def test_video_summarization():
     """Тестирование суммаризации нового видео"""
     
@@ -63,8 +66,7 @@ async def test_video_summarization():
         print("="*40)
         
         # Показываем как работает система
-        chunks = summarizer.split_text(demo_text)
-        print(f"✂️  Разбивка текста: {len(chunks)} частей")
+        print(f"✂️  Разбивка текста: {summarizer.count_chunks(demo_text)} частей")
         
         print(f"\n🤖 Доступные модели:")
         for i, (name, model_id) in enumerate(summarizer.models[:4]):
@@ -116,6 +118,7 @@ YouTube контента с помощью ИИ-моделей.
         print(f"❌ Ошибка: {e}")
         return False
 
+@buffered_output
 def show_next_steps():
     """Показывает следующие шаги для полного тестирования"""
     
@@ -142,7 +145,8 @@ if __name__ == "__main__":
     print("Система анализа YouTube контента")
     print()
     
-    success = asyncio.run(test_video_summarization())
+    from _async_runner import AsyncLoopThread
+    success = AsyncLoopThread.get().run(test_video_summarization())
     
     if success:
         print(f"\n🎉 ТЕСТИРОВАНИЕ ЗАВЕРШЕНО!")
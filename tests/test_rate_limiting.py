@@ -5,10 +5,85 @@ Test script for rate limiting functionality
 
 import asyncio
 import time
-from bot import rate_limit_check, global_rate_limit_check, get_transcript_with_retry, get_available_transcripts_with_retry
+import tracemalloc
+import pytest
+from unittest.mock import patch
+from _output import buffered_output
 
+class FakeClock:
+    """Виртуальные часы rate limiter'а: окно "проходит" мгновенно"""
+    
+    def __init__(self):
+        self.now = time.time()
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+def test_rate_limit_table_backend():
+    """Хранилище отметок rate limit: значения по user_id и постоянный объём памяти"""
+    from rate_limit_store import TimestampTable
+    
+    table = TimestampTable()
+    users = range(1, 10_001)
+    
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for user_id in users:
+            table[user_id] = 1000.0 + user_id
+        grown = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    
+    # Массивы выделены заранее: запись 10k пользователей не выделяет память
+    assert grown < 1024
+    assert all(table.get(user_id) == 1000.0 + user_id for user_id in users)
+    assert table.get(20_000) == 0
+    
+    table[1] = 5000.0
+    assert table.get(1) == 5000.0
+    table.clear()
+    assert table.get(1) == 0
+
+def test_rate_limit_table_collisions():
+    """Переполненное окно пробирования не вытесняет отметки, неположительная отметка отклоняется"""
+    from rate_limit_store import TimestampTable
+    
+    table = TimestampTable(bits=3)  # 8 слотов: окна заполняются сразу
+    users = range(1, 101)
+    for user_id in users:
+        table[user_id] = 1000.0 + user_id
+    assert all(table.get(user_id) == 1000.0 + user_id for user_id in users)
+    
+    # Повторная запись обновляет отметку, а не создаёт дубликат ключа
+    table[50] = 9000.0
+    assert table.get(50) == 9000.0
+    
+    for bad in (0, -1.0, float('nan')):
+        with pytest.raises(ValueError):
+            table[1] = bad
+    assert table.get(1) == 1001.0
+
+# Пункты 3-4 обращаются к YouTube (ретраи с реальными задержками)
+@pytest.mark.slow
+@pytest.mark.fail_slow("30s")
+@buffered_output
 async def test_rate_limiting():
     """Test the rate limiting functionality"""
+    # bot импортируется лениво: тянет telegram и прочие тяжёлые зависимости,
+    # а тест по умолчанию пропускается (slow)
+    import bot
+    clock = FakeClock()
+    with patch.object(bot, "_now", clock):
+        await _check_rate_limits(clock)
+    await _check_transcript_retry()
+
+async def _check_rate_limits(clock):
+    import bot
+    
     print("🧪 Testing Rate Limiting Functionality")
     print("=" * 50)
     
@@ -17,42 +92,45 @@ async def test_rate_limiting():
     user_id = 12345
     
     # First request should succeed
-    result1 = await rate_limit_check(user_id)
+    result1 = await bot.rate_limit_check(user_id)
     print(f"   First request: {'✅ PASS' if result1 else '❌ FAIL'}")
     
     # Second request within interval should fail
-    result2 = await rate_limit_check(user_id)
+    result2 = await bot.rate_limit_check(user_id)
     print(f"   Second request (immediate): {'❌ PASS (should fail)' if not result2 else '❌ FAIL (should fail)'}")
     
     # Wait and try again
-    print("   Waiting 16 seconds...")
-    await asyncio.sleep(16)
-    result3 = await rate_limit_check(user_id)
+    print(f"   Advancing clock {bot.MIN_REQUEST_INTERVAL + 1} seconds...")
+    clock.advance(bot.MIN_REQUEST_INTERVAL + 1)
+    result3 = await bot.rate_limit_check(user_id)
     print(f"   Third request (after wait): {'✅ PASS' if result3 else '❌ FAIL'}")
     
     # Test global rate limiting
     print("\n2. Testing Global Rate Limiting:")
     
     # First request should succeed
-    result1 = await global_rate_limit_check()
+    result1 = await bot.global_rate_limit_check()
     print(f"   First global request: {'✅ PASS' if result1 else '❌ FAIL'}")
     
     # Second request immediately should fail
-    result2 = await global_rate_limit_check()
+    result2 = await bot.global_rate_limit_check()
     print(f"   Second global request (immediate): {'❌ PASS (should fail)' if not result2 else '❌ FAIL (should fail)'}")
     
     # Wait and try again
-    print("   Waiting 3 seconds...")
-    await asyncio.sleep(3)
-    result3 = await global_rate_limit_check()
+    print(f"   Advancing clock {bot.GLOBAL_MIN_REQUEST_INTERVAL + 1} seconds...")
+    clock.advance(bot.GLOBAL_MIN_REQUEST_INTERVAL + 1)
+    result3 = await bot.global_rate_limit_check()
     print(f"   Third global request (after wait): {'✅ PASS' if result3 else '❌ FAIL'}")
+
+async def _check_transcript_retry():
+    import bot
     
     # Test transcript retrieval with retry (using a real video ID)
     print("\n3. Testing Transcript Retrieval with Retry:")
     test_video_id = "dQw4w9WgXcQ"  # Rick Roll - should have transcripts
     
     print("   Testing get_available_transcripts_with_retry...")
-    transcripts, success, error = await get_available_transcripts_with_retry(test_video_id)
+    transcripts, success, error = await bot.get_available_transcripts_with_retry(test_video_id)
     
     if success:
         print(f"   ✅ Success: Found {len(transcripts)} transcript(s)")
@@ -66,7 +144,7 @@ async def test_rate_limiting():
         lang_code = transcripts[0].language_code
         print(f"   Testing get_transcript_with_retry for language: {lang_code}")
         
-        transcript_data, success, error = await get_transcript_with_retry(test_video_id, [lang_code])
+        transcript_data, success, error = await bot.get_transcript_with_retry(test_video_id, [lang_code])
         
         if success:
             print(f"   ✅ Success: Retrieved {len(transcript_data)} subtitle entries")
@@ -79,4 +157,5 @@ async def test_rate_limiting():
     print("🎉 Rate limiting tests completed!")
 
 if __name__ == "__main__":
-    asyncio.run(test_rate_limiting()) 
\ No newline at end of file
+    from _async_runner import AsyncLoopThread
+    AsyncLoopThread.get().run(test_rate_limiting()) 
\ No newline at end of file
@@ -1,23 +1,119 @@
 #!/usr/bin/env python3
 """
 Тестирование функционала на реальном YouTube видео
-Запуск: python test_real_video.py <youtube_url>
+Запуск: python test_real_video.py <youtube_url> [--lang ru] [--fallback-lang en] [--skip-ai]
 """
 
 import sys
 import os
+import argparse
+import atexit
+import json
+import time
+import threading
 import asyncio
+import functools
 from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
 
 # Импортируем наши модули
 try:
-    from bot import extract_video_id, get_available_transcripts, format_subtitles
+    from bot import extract_video_id, format_subtitles, format_subtitles_both
     from summarizer import TextSummarizer
-    from youtube_transcript_api import YouTubeTranscriptApi
+    from youtube_transcript_api import YouTubeTranscriptApi, FetchedTranscriptSnippet
+    import requests
 except ImportError as e:
     print(f"❌ Ошибка импорта: {e}")
     sys.exit(1)
 
+from _output import buffered_output
+
+# Ручной скрипт (нужен URL видео и сеть): pytest его не собирает
+__test__ = False
+
+# Ключ читается один раз, после импорта bot/summarizer (они загружают .env)
+OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+
+# Одновременных запросов к YouTube при скачивании субтитров
+MAX_CONCURRENT_DOWNLOADS = 8
+# Одновременных запросов к OpenRouter при сравнении моделей
+MAX_CONCURRENT_MODELS = 4
+
+# HTTP-сессии с keep-alive: TCP/TLS-соединения переиспользуются между запросами.
+# YouTubeTranscriptApi не потокобезопасен, поэтому у каждого потока своя сессия
+_thread_sessions = threading.local()
+_http_sessions = []
+
+
+def _new_http_session():
+    """Новая requests.Session, закрываемая при выходе"""
+    session = requests.Session()
+    _http_sessions.append(session)
+    return session
+
+
+def _http_session():
+    """requests.Session текущего потока"""
+    session = getattr(_thread_sessions, 'session', None)
+    if session is None:
+        session = _thread_sessions.session = _new_http_session()
+    return session
+
+
+@atexit.register
+def _close_http_sessions():
+    for session in _http_sessions:
+        session.close()
+
+
+# Кэш загрузок на диске: повторные прогоны на том же видео обходятся без сети
+TRANSCRIPT_CACHE_DIR = Path(__file__).parent / ".transcript_cache"
+TRANSCRIPT_CACHE_TTL = 24 * 3600  # Свежесть записи по mtime файла, 24 часа
+
+
+def _read_cache(key):
+    """Данные из кэша или None, если записи нет или она устарела"""
+    path = TRANSCRIPT_CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > TRANSCRIPT_CACHE_TTL:
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(key, data):
+    """Сохраняет данные в кэш"""
+    TRANSCRIPT_CACHE_DIR.mkdir(exist_ok=True)
+    with open(TRANSCRIPT_CACHE_DIR / f"{key}.json", 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=128)
+def list_languages(video_id):
+    """Доступные языки субтитров видео (с кэшированием)"""
+    languages = _read_cache(f"{video_id}_languages")
+    if languages is None:
+        languages = [
+            {'language': t.language, 'language_code': t.language_code}
+            for t in YouTubeTranscriptApi(http_client=_http_session()).list(video_id)
+        ]
+        _write_cache(f"{video_id}_languages", languages)
+    return tuple(SimpleNamespace(**item) for item in languages)
+
+
+@functools.lru_cache(maxsize=128)
+def fetch_transcript(video_id, lang_code):
+    """Субтитры видео на языке lang_code (с кэшированием)"""
+    raw = _read_cache(f"{video_id}_{lang_code}")
+    if raw is None:
+        api = YouTubeTranscriptApi(http_client=_http_session())
+        raw = api.fetch(video_id, languages=[lang_code]).to_raw_data()
+        _write_cache(f"{video_id}_{lang_code}", raw)
+    return tuple(FetchedTranscriptSnippet(**item) for item in raw)
+
 
 def print_separator(title=""):
     """Красивый разделитель"""
@@ -27,6 +123,7 @@ def print_separator(title=""):
         print("="*60)
 
 
+@buffered_output
 def test_extract_video_id(url):
     """Тест извлечения video_id"""
     print_separator("ТЕСТ 1: Извлечение Video ID")
@@ -44,6 +141,7 @@ def test_extract_video_id(url):
         return None
 
 
+@buffered_output
 def test_get_transcripts(video_id):
     """Тест получения доступных субтитров"""
     print_separator("ТЕСТ 2: Получение списка субтитров")
@@ -51,7 +149,7 @@ def test_get_transcripts(video_id):
     print(f"🔍 Проверяем доступные субтитры для {video_id}...")
     
     try:
-        transcripts = get_available_transcripts(video_id)
+        transcripts = list_languages(video_id)
         
         if transcripts:
             transcripts_list = list(transcripts)
@@ -71,88 +169,132 @@ def test_get_transcripts(video_id):
         return None
 
 
-def test_download_subtitles(video_id, lang_code='ru'):
-    """Тест скачивания субтитров"""
-    print_separator(f"ТЕСТ 3: Скачивание субтитров ({lang_code})")
+async def _fetch_transcript(video_id, lang_code, semaphore):
+    """Скачивание субтитров одного языка в пуле потоков (API синхронный)"""
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        return await loop.run_in_executor(None, fetch_transcript, video_id, lang_code)
+
+
+@buffered_output
+async def test_download_subtitles(video_id, lang_codes):
+    """Тест скачивания субтитров: все языки параллельно"""
+    print_separator(f"ТЕСТ 3: Скачивание субтитров ({', '.join(lang_codes)})")
     
-    try:
-        print(f"⬇️ Скачиваем субтитры на языке: {lang_code}")
+    print(f"⬇️ Скачиваем субтитры на языках: {', '.join(lang_codes)}")
+    
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    results = await asyncio.gather(
+        *(_fetch_transcript(video_id, lang_code, semaphore) for lang_code in lang_codes),
+        return_exceptions=True
+    )
+    
+    transcripts = {}
+    for lang_code, transcript in zip(lang_codes, results):
+        print(f"\n🌐 Язык: {lang_code}")
         
-        transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[lang_code])
+        if isinstance(transcript, Exception):
+            print(f"❌ Ошибка скачивания субтитров: {transcript}")
+            continue
         
-        if transcript:
-            print(f"✅ Субтитры получены: {len(transcript)} сегментов")
-            
-            # Форматируем разными способами
-            plain_text = format_subtitles(transcript, with_time=False)
-            time_text = format_subtitles(transcript, with_time=True)
-            
-            print(f"📊 Статистика:")
-            print(f"   • Сегментов: {len(transcript)}")
-            print(f"   • Символов (без меток): {len(plain_text)}")
-            print(f"   • Символов (с метками): {len(time_text)}")
-            
-            # Показываем первые 3 строки
-            print(f"\n📝 Первые строки (без времени):")
-            lines = plain_text.split('\n')[:3]
-            for i, line in enumerate(lines, 1):
-                print(f"   {i}. {line}")
-            
-            print(f"\n🕐 Первые строки (с временными метками):")
-            time_lines = time_text.split('\n')[:3]
-            for i, line in enumerate(time_lines, 1):
-                print(f"   {i}. {line}")
-            
-            return plain_text
-        else:
+        if not transcript:
             print("❌ Субтитры пусты")
-            return None
-            
-    except Exception as e:
-        print(f"❌ Ошибка скачивания субтитров: {e}")
-        return None
+            continue
+        
+        print(f"✅ Субтитры получены: {len(transcript)} сегментов")
+        
+        # Форматируем обоими способами за один проход
+        plain_text, time_text = format_subtitles_both(transcript)
+        
+        print(f"📊 Статистика:")
+        print(f"   • Сегментов: {len(transcript)}")
+        print(f"   • Символов (без меток): {len(plain_text)}")
+        print(f"   • Символов (с метками): {len(time_text)}")
+        
+        # Показываем первые 3 строки (maxsplit: не режем весь текст на строки)
+        print(f"\n📝 Первые строки (без времени):")
+        lines = plain_text.split('\n', 3)[:3]
+        for i, line in enumerate(lines, 1):
+            print(f"   {i}. {line}")
+        
+        print(f"\n🕐 Первые строки (с временными метками):")
+        time_lines = time_text.split('\n', 3)[:3]
+        for i, line in enumerate(time_lines, 1):
+            print(f"   {i}. {line}")
+        
+        transcripts[lang_code] = transcript
+    
+    return transcripts
 
 
-async def test_ai_summarization(text):
+async def test_ai_summarization(transcript):
     """Тест ИИ-суммаризации"""
     print_separator("ТЕСТ 4: ИИ-суммаризация")
     
     # Проверяем наличие API ключа
-    openrouter_key = os.getenv('OPENROUTER_API_KEY')
-    if not openrouter_key:
+    if not OPENROUTER_API_KEY:
         print("⚠️ OPENROUTER_API_KEY не найден в переменных окружения")
         print("💡 Для теста ИИ-суммаризации нужен API ключ OpenRouter")
         print("   Получить можно на: https://openrouter.ai/")
         return None
     
-    print(f"🤖 API ключ найден: {openrouter_key[:10]}...{openrouter_key[-4:]}")
+    print(f"🤖 API ключ найден: {OPENROUTER_API_KEY[:10]}...{OPENROUTER_API_KEY[-4:]}")
     
     try:
+        # Только список моделей и настройки: запросы идут через экземпляры моделей
         summarizer = TextSummarizer()
         
         print(f"📊 Модели доступны: {len(summarizer.models)}")
         print(f"🔧 Размер частей: {summarizer.chunk_size} символов")
         
-        # Ограничиваем текст для экономии API вызовов (первые 2000 символов)
-        test_text = text[:2000] if len(text) > 2000 else text
+        # Ограничиваем текст для экономии API вызовов (первые 2000 символов):
+        # форматируется только нужное начало, а не весь транскрипт
+        test_text = format_subtitles(transcript, with_time=False, max_chars=2000)
         
         print(f"📝 Обрабатываем текст: {len(test_text)} символов")
-        print(f"⏳ Начинаем суммаризацию... (может занять 1-2 минуты)")
+        print(f"⏳ Суммаризируем всеми моделями параллельно... (может занять 1-2 минуты)")
         
-        start_time = datetime.now()
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_MODELS)
         
-        summary, stats = await summarizer.summarize_text(test_text, model_index=0)
+        async def summarize_with(model_index):
+            # Свой экземпляр и своя сессия на модель: TextSummarizer хранит данные
+            # последнего запроса (_last_api_info), а requests.Session не
+            # потокобезопасна - запросы моделей идут из разных потоков пула
+            model_summarizer = TextSummarizer(http_session=_new_http_session())
+            async with semaphore:
+                t0 = time.perf_counter()
+                summary, stats = await model_summarizer.summarize_text(
+                    test_text, forced_model_index=model_index
+                )
+                return summary, stats, time.perf_counter() - t0
         
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
+        t0 = time.perf_counter()
+        results = await asyncio.gather(
+            *(summarize_with(i) for i in range(len(summarizer.models))),
+            return_exceptions=True
+        )
+        duration = time.perf_counter() - t0
         
         print(f"✅ Суммаризация завершена за {duration:.1f} секунд")
         
-        print(f"\n📊 Статистика обработки:")
-        for key, value in stats.items():
-            print(f"   • {key}: {value}")
+        print(f"\n📊 Сравнение моделей:")
+        print(f"   {'Модель':<28} {'Время, с':>9} {'Символов':>9}")
+        summaries = {}
+        for (model_name, _), result in zip(summarizer.models, results):
+            if isinstance(result, Exception):
+                print(f"   {model_name:<28} ❌ {result}")
+                continue
+            summary, stats, elapsed = result
+            print(f"   {model_name:<28} {elapsed:>9.1f} {len(summary):>9}")
+            if not summary.startswith("❌"):
+                summaries[model_name] = summary
         
-        print(f"\n🤖 РЕЗУЛЬТАТ СУММАРИЗАЦИИ:")
+        if not summaries:
+            print("❌ Ни одна модель не вернула суммаризацию")
+            return None
+        
+        model_name, summary = next(iter(summaries.items()))
+        print(f"\n🤖 РЕЗУЛЬТАТ СУММАРИЗАЦИИ ({model_name}):")
         print("-" * 40)
         print(summary)
         print("-" * 40)
@@ -164,15 +306,26 @@ async def test_ai_summarization(text):
         return None
 
 
-def main():
+def parse_args(argv=None):
+    """Аргументы командной строки: без них URL запрашивается интерактивно"""
+    parser = argparse.ArgumentParser(description="Тестирование на реальном YouTube видео")
+    parser.add_argument('url', nargs='?', help="ссылка на YouTube видео")
+    parser.add_argument('--url', dest='url_option', metavar='URL',
+                        help="ссылка на YouTube видео (то же, что позиционный аргумент)")
+    parser.add_argument('--lang', help="код языка субтитров (по умолчанию ru, затем en)")
+    parser.add_argument('--fallback-lang', help="запасной язык, если выбранный не скачался")
+    parser.add_argument('--skip-ai', action='store_true', help="не запускать ИИ-суммаризацию")
+    return parser.parse_args(argv)
+
+
+async def main(args):
     """Основная функция тестирования"""
     print("🎬 ТЕСТИРОВАНИЕ НА РЕАЛЬНОМ YOUTUBE ВИДЕО")
     print(f"⏰ Время запуска: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Получаем URL из аргументов командной строки или запрашиваем
-    if len(sys.argv) > 1:
-        url = sys.argv[1]
-    else:
+    url = args.url_option or args.url
+    if not url:
         url = input("\n🔗 Введите ссылку на YouTube видео: ").strip()
     
     if not url:
@@ -193,28 +346,44 @@ def main():
         print("\n💥 Субтитры недоступны. Дальнейшее тестирование невозможно.")
         return
     
-    # Выбираем язык для тестирования
-    lang_code = 'ru'  # По умолчанию русский
-    available_langs = [t.language_code for t in transcripts]
+    # Выбираем язык для тестирования: коды без повторов в порядке YouTube
+    # и множество для проверок наличия
+    available_langs = list(dict.fromkeys(t.language_code for t in transcripts))
+    available = set(available_langs)
     
-    if 'ru' not in available_langs and 'en' in available_langs:
-        lang_code = 'en'
-    elif 'ru' not in available_langs and 'en' not in available_langs:
-        lang_code = available_langs[0]  # Берем первый доступный
+    if args.lang:
+        if args.lang not in available:
+            print(f"\n💥 Субтитры на языке {args.lang} недоступны: {', '.join(available_langs)}")
+            return
+        lang_code = args.lang
+    else:
+        # По умолчанию русский, затем английский, иначе первый доступный
+        lang_code = 'ru' if 'ru' in available else ('en' if 'en' in available else available_langs[0])
     
     print(f"\n🎯 Выбран язык для тестирования: {lang_code}")
     
-    # Тест 3: Скачивание субтитров
-    subtitles_text = test_download_subtitles(video_id, lang_code)
-    if not subtitles_text:
+    # Тест 3: Скачивание субтитров - только выбранный язык; запасной
+    # (--fallback-lang) запрашивается, лишь если основной не скачался
+    subtitles = await test_download_subtitles(video_id, [lang_code])
+    transcript = subtitles.get(lang_code)
+    fallback = args.fallback_lang
+    if not transcript and fallback and fallback != lang_code:
+        if fallback in available:
+            print(f"\n🔄 Пробуем запасной язык: {fallback}")
+            subtitles = await test_download_subtitles(video_id, [fallback])
+            transcript = subtitles.get(fallback)
+        else:
+            print(f"\n⚠️ Запасной язык {fallback} недоступен")
+    if not transcript:
         print("\n💥 Не удалось получить субтитры.")
         return
     
-    # Тест 4: ИИ-суммаризация (асинхронно)
-    try:
-        asyncio.run(test_ai_summarization(subtitles_text))
-    except Exception as e:
-        print(f"❌ Ошибка в асинхронном тесте: {e}")
+    # Тест 4: ИИ-суммаризация
+    if not args.skip_ai:
+        try:
+            await test_ai_summarization(transcript)
+        except Exception as e:
+            print(f"❌ Ошибка в асинхронном тесте: {e}")
     
     # Итоги
     print_separator("ИТОГИ ТЕСТИРОВАНИЯ")
@@ -222,8 +391,9 @@ def main():
     print("✅ Получение списка субтитров: РАБОТАЕТ") 
     print("✅ Скачивание субтитров: РАБОТАЕТ")
     
-    openrouter_key = os.getenv('OPENROUTER_API_KEY')
-    if openrouter_key:
+    if args.skip_ai:
+        print("⏭️ ИИ-суммаризация: ПРОПУЩЕНА (--skip-ai)")
+    elif OPENROUTER_API_KEY:
         print("✅ ИИ-суммаризация: ПРОТЕСТИРОВАНА")
     else:
         print("⚠️ ИИ-суммаризация: НЕ ТЕСТИРОВАЛАСЬ (нет API ключа)")
@@ -233,4 +403,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    from _async_runner import AsyncLoopThread
+    AsyncLoopThread.get().run(main(parse_args())) 
\ No newline at end of file
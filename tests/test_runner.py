@@ -4,11 +4,16 @@
 Поддерживает различные режимы тестирования
 """
 
+import argparse
 import subprocess
 import sys
 import os
+import importlib.util
+import functools
 from pathlib import Path
 
+from _output import buffered_output
+
 
 def run_command(cmd, description=""):
     """Запускает команду и выводит результат"""
@@ -17,41 +22,42 @@ def run_command(cmd, description=""):
     print(f"Команда: {' '.join(cmd)}")
     print(f"{'='*60}")
     
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    # Вывод печатается построчно по мере поступления, а не копится в памяти
+    # до завершения; stderr объединён со stdout, чтобы сохранить порядок строк
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, bufsize=1) as proc:
+        for line in proc.stdout:
+            print(line, end='')
+        returncode = proc.wait()
+    
+    if returncode == 0:
         print("✅ УСПЕШНО")
-        if result.stdout:
-            print(f"Вывод:\n{result.stdout}")
         return True
-    except subprocess.CalledProcessError as e:
-        print("❌ ОШИБКА")
-        print(f"Код возврата: {e.returncode}")
-        if e.stdout:
-            print(f"Вывод:\n{e.stdout}")
-        if e.stderr:
-            print(f"Ошибки:\n{e.stderr}")
-        return False
+    
+    print("❌ ОШИБКА")
+    print(f"Код возврата: {returncode}")
+    return False
 
 
 def check_dependencies():
     """Проверяет наличие необходимых зависимостей"""
     print("🔍 Проверка зависимостей...")
     
-    required_packages = [
-        'pytest',
-        'pytest-asyncio',
-        'responses',
-        'python-telegram-bot',
-        'youtube-transcript-api'
-    ]
-    
-    missing_packages = []
+    # Пакет pip -> импортируемый модуль
+    required_packages = {
+        'pytest': 'pytest',
+        'pytest-asyncio': 'pytest_asyncio',
+        'responses': 'responses',
+        'python-telegram-bot': 'telegram',
+        'youtube-transcript-api': 'youtube_transcript_api'
+    }
     
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
+    # find_spec только ищет модуль и не выполняет его код: микросекунды
+    # на пакет вместо импорта telegram и его зависимостей
+    missing_packages = [
+        package for package, module in required_packages.items()
+        if importlib.util.find_spec(module) is None
+    ]
     
     if missing_packages:
         print(f"❌ Отсутствуют пакеты: {', '.join(missing_packages)}")
@@ -63,14 +69,33 @@ def check_dependencies():
     return True
 
 
+def parallel_args():
+    """Флаги параллельного запуска, если установлен pytest-xdist (необязательный)"""
+    if importlib.util.find_spec('xdist') is None:
+        return []
+    # loadgroup: тесты с одной меткой xdist_group выполняются на одном воркере
+    return ['-n', 'auto', '--dist', 'loadgroup']
+
+
+def fail_slow_args():
+    """Бюджет времени юнит-теста, если установлен pytest-fail-slow (необязательный)"""
+    if importlib.util.find_spec('pytest_fail_slow') is None:
+        return []
+    return ['--fail-slow=500ms']
+
+
 def run_unit_tests():
     """Запускает юнит-тесты"""
+    # Только юнит-тесты получают бюджет 500 мс: интеграционные ходят в сеть
+    # и подпроцессы, для них медленный прогон - не ошибка
     cmd = [
         sys.executable, '-m', 'pytest',
         'test_summarizer.py::TestTextSummarizer',
         'test_bot.py::TestBotUtilityFunctions',
         'test_bot.py::TestBotKeyboards',
-        '-v', '--tb=short'
+        '-v', '--tb=short',
+        *parallel_args(),
+        *fail_slow_args()
     ]
     return run_command(cmd, "Юнит-тесты (быстрые, без внешних API)")
 
@@ -82,22 +107,24 @@ def run_integration_tests():
         'test_bot.py::TestBotHandlers',
         'test_integration.py::TestFullWorkflow',
         'test_integration.py::TestEdgeCases',
-        '-v', '--tb=short'
+        '-v', '--tb=short',
+        *parallel_args()
     ]
     return run_command(cmd, "Интеграционные тесты (с мокированными API)")
 
 
-def run_slow_tests():
+def run_slow_tests(confirm=True):
     """Запускает медленные тесты с реальными API"""
     print("\n⚠️  ВНИМАНИЕ: Медленные тесты требуют:")
     print("   • OPENROUTER_API_KEY в переменных окружения")
     print("   • Интернет-соединение")
     print("   • Могут занять несколько минут")
     
-    response = input("\nПродолжить? (y/N): ").strip().lower()
-    if response != 'y':
-        print("Пропускаем медленные тесты")
-        return True
+    if confirm:
+        response = input("\nПродолжить? (y/N): ").strip().lower()
+        if response != 'y':
+            print("Пропускаем медленные тесты")
+            return True
     
     cmd = [
         sys.executable, '-m', 'pytest',
@@ -112,11 +139,40 @@ def run_all_tests():
     cmd = [
         sys.executable, '-m', 'pytest',
         '-v', '--tb=short',
-        '--durations=10'
+        '--durations=10',
+        '--ff',  # Сначала тесты, упавшие в прошлый раз (.pytest_cache)
+        *parallel_args()
     ]
     return run_command(cmd, "Все тесты (кроме медленных)")
 
 
+def run_failed_tests():
+    """Перезапускает только тесты, упавшие в прошлом запуске"""
+    cmd = [
+        sys.executable, '-m', 'pytest',
+        '--lf',
+        '-v', '--tb=short'
+    ]
+    return run_command(cmd, "Упавшие в прошлый раз тесты")
+
+
+def run_watch_mode():
+    """Перезапускает тесты при изменении файлов (pytest-watch)"""
+    if importlib.util.find_spec('pytest_watch') is None:
+        print("❌ Пакет 'pytest-watch' не установлен")
+        print("Установите: pip install pytest-watch")
+        return False
+    
+    print("\n👀 Режим наблюдения: Ctrl+C для возврата в меню")
+    # Сначала упавшие тесты, первая ошибка останавливает прогон
+    cmd = [sys.executable, '-m', 'pytest_watch', '--', '--ff', '-x', '--tb=short']
+    try:
+        return run_command(cmd, "Тесты в режиме наблюдения")
+    except KeyboardInterrupt:
+        print("\n⏹️ Режим наблюдения остановлен")
+        return True
+
+
 def run_coverage_tests():
     """Запускает тесты с анализом покрытия"""
     try:
@@ -137,10 +193,22 @@ def run_coverage_tests():
     return run_command(cmd, "Тесты с анализом покрытия кода")
 
 
+@functools.lru_cache(maxsize=1)
+def _list_test_files():
+    """Тестовые файлы текущего каталога (один обход каталога за сессию)"""
+    return tuple(Path('.').glob('test_*.py'))
+
+
+def refresh_test_files():
+    """Сбрасывает кэш списка тестовых файлов"""
+    _list_test_files.cache_clear()
+    print(f"🔄 Список обновлён: {len(_list_test_files())} тестовых файлов")
+
+
 def run_specific_test():
     """Запускает конкретный тест"""
     print("\nДоступные тестовые файлы:")
-    test_files = list(Path('.').glob('test_*.py'))
+    test_files = _list_test_files()
     
     for i, file in enumerate(test_files, 1):
         print(f"  {i}. {file.name}")
@@ -159,6 +227,7 @@ def run_specific_test():
         return False
 
 
+@buffered_output
 def show_test_structure():
     """Показывает структуру тестов"""
     print("\n📋 СТРУКТУРА ТЕСТОВ:")
@@ -186,8 +255,29 @@ def show_test_structure():
     print("   • @pytest.mark.asyncio - асинхронные тесты")
 
 
-def main():
+# Режимы для запуска без меню: python test_runner.py --mode unit
+MODES = {
+    'unit': run_unit_tests,
+    'integration': run_integration_tests,
+    'slow': lambda: run_slow_tests(confirm=False),
+    'all': run_all_tests,
+    'coverage': run_coverage_tests,
+    'failed': run_failed_tests,
+    'watch': run_watch_mode,
+}
+
+
+def parse_args(argv=None):
+    """Аргументы командной строки: без --mode открывается интерактивное меню"""
+    parser = argparse.ArgumentParser(description="Запуск тестов Telegram YouTube Subtitles Bot")
+    parser.add_argument('--mode', choices=list(MODES), help="режим запуска без меню")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Главная функция"""
+    args = parse_args(argv)
+    
     print("🤖 ТЕСТИРОВАНИЕ TELEGRAM YOUTUBE SUBTITLES BOT")
     print("=" * 60)
     
@@ -195,6 +285,10 @@ def main():
     if not check_dependencies():
         sys.exit(1)
     
+    if args.mode:
+        # Неинтерактивный запуск (CI, скрипты): код возврата по результату
+        sys.exit(0 if MODES[args.mode]() else 1)
+    
     while True:
         print("\n📋 ВЫБЕРИТЕ РЕЖИМ ТЕСТИРОВАНИЯ:")
         print("1. 🚀 Быстрые юнит-тесты")
@@ -204,10 +298,13 @@ def main():
         print("5. 📈 Тесты с покрытием кода")
         print("6. 🎯 Конкретный тестовый файл")
         print("7. 📋 Показать структуру тестов")
-        print("8. ❌ Выход")
+        print("8. 🔁 Перезапустить упавшие тесты")
+        print("9. 👀 Режим наблюдения (перезапуск при изменениях)")
+        print("10. 🔄 Обновить список тестовых файлов")
+        print("11. ❌ Выход")
         
         try:
-            choice = input("\nВаш выбор (1-8): ").strip()
+            choice = input("\nВаш выбор (1-11): ").strip()
             
             if choice == '1':
                 run_unit_tests()
@@ -224,6 +321,12 @@ def main():
             elif choice == '7':
                 show_test_structure()
             elif choice == '8':
+                run_failed_tests()
+            elif choice == '9':
+                run_watch_mode()
+            elif choice == '10':
+                refresh_test_files()
+            elif choice == '11':
                 print("👋 До свидания!")
                 break
             else:
@@ -1,7 +1,7 @@
 import pytest
 import asyncio
 import os
-from unittest.mock import patch, MagicMock, AsyncMock
+from unittest.mock import patch, MagicMock, AsyncMock, DEFAULT
 import responses
 from summarizer import TextSummarizer
 
@@ -53,6 +53,18 @@ class TestTextSummarizer:
         for chunk in chunks:
             assert len(chunk) <= 200
     
+    @pytest.mark.parametrize("text, max_len", [
+        ("", 100),
+        ("\n\n\n", 100),
+        ("Короткий текст для теста", 100),
+        (" ".join(["слово"] * 200), 500),
+        ("Первая строка\nВторая строка\nТретья строка\n" * 50, 200),
+        ("x" * 150 + " короткое " + "y" * 150, 100),
+    ], ids=["empty", "newlines_only", "short", "long", "multiline", "oversized_words"])
+    def test_count_chunks_matches_split_text(self, summarizer, text, max_len):
+        """count_chunks совпадает с числом частей split_text"""
+        assert summarizer.count_chunks(text, max_len) == len(summarizer.split_text(text, max_len))
+    
     @pytest.mark.asyncio
     @responses.activate
     async def test_make_request_success(self, summarizer):
@@ -158,12 +170,14 @@ class TestTextSummarizer:
             assert 'model' in stats
     
     @pytest.mark.asyncio
-    async def test_summarize_text_long(self, summarizer):
+    async def test_summarize_text_long(self, summarizer, no_sleep):
         """Тест суммаризации длинного текста"""
         text = "Длинный текст. " * 200  # ~2800 символов
         
-        with patch.object(summarizer, '_make_request', new_callable=AsyncMock) as mock_request, \
-             patch.object(summarizer, '_create_final_summary_with_retry', new_callable=AsyncMock) as mock_final:
+        with patch.multiple(summarizer, _make_request=DEFAULT, _create_final_summary_with_retry=DEFAULT,
+                            new_callable=AsyncMock) as mocks:
+            mock_request = mocks['_make_request']
+            mock_final = mocks['_create_final_summary_with_retry']
             
             # Возвращаем разные ответы для частей (должно быть 4 части для ~2800 символов)
             mock_request.side_effect = [
@@ -74,8 +74,8 @@ class TestVoiceTranscriptionErrorFix:
             assert True, "Функция выполнилась без ошибок"
             
             # Проверяем, что не было вызовов log_and_notify_error с ошибкой NameError
-            error_calls = [call for call in mock_notify.call_args_list if 'NameError' in str(call)]
-            assert len(error_calls) == 0, "Не должно быть ошибок NameError"
+            notified = "\n".join(map(str, mock_notify.call_args_list))
+            assert 'NameError' not in notified, "Не должно быть ошибок NameError"
             
         except NameError as e:
             if "video_id" in str(e):
@@ -116,8 +116,8 @@ class TestVoiceTranscriptionErrorFix:
             assert True, "Функция выполнилась без ошибок"
             
             # Проверяем, что не было вызовов log_and_notify_error с ошибкой NameError
-            error_calls = [call for call in mock_notify.call_args_list if 'NameError' in str(call)]
-            assert len(error_calls) == 0, "Не должно быть ошибок NameError"
+            notified = "\n".join(map(str, mock_notify.call_args_list))
+            assert 'NameError' not in notified, "Не должно быть ошибок NameError"
             
         except NameError as e:
             if "video_id" in str(e):
@@ -0,0 +1,106 @@
+"""
+Состояния пользователей Subs-bot
+
+Отслеживаем состояние пользователя ('expecting_mind_map_text', 'normal', ...)
+для правильной обработки его следующих сообщений. Модуль не зависит от
+Telegram и остального бота, поэтому импортируется без тяжёлых зависимостей.
+"""
+
+import time
+import heapq
+import logging
+from collections import OrderedDict
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# OrderedDict в порядке последней установки: при превышении USER_STATE_MAX
+# за O(1) вытесняется самый давний пользователь
+user_states: "OrderedDict[int, str]" = OrderedDict()
+USER_STATE_MAX = 100_000
+USER_STATE_TTL = 3600  # Состояние неактивного пользователя живёт 1 час
+# Очередь истечения состояний: куча (время_истечения, user_id) и время
+# установки; у каждого user_id из _state_set_time ровно одна запись в куче
+_state_expiry: list[tuple[float, int]] = []
+_state_set_time: dict[int, float] = {}
+
+
+def set_state(user_id: int, state: str):
+    """Устанавливает состояние пользователя (синхронно)"""
+    user_states[user_id] = state
+    user_states.move_to_end(user_id)
+    now = time.time()
+    if user_id not in _state_set_time:
+        heapq.heappush(_state_expiry, (now + USER_STATE_TTL, user_id))
+    _state_set_time[user_id] = now
+    if len(user_states) > USER_STATE_MAX:
+        user_states.popitem(last=False)
+    logger.info(f"🔄 Пользователь {user_id} переведен в состояние: {state}")
+
+
+def get_state(user_id: int) -> str:
+    """Получает текущее состояние пользователя (синхронно)"""
+    return user_states.get(user_id, 'normal')
+
+
+def clear_state(user_id: int):
+    """Очищает состояние пользователя (синхронно)"""
+    if user_id in user_states:
+        del user_states[user_id]
+        logger.info(f"🔄 Состояние пользователя {user_id} очищено")
+
+
+# Асинхронный интерфейс для обработчиков бота: операции ничего не ждут,
+# поэтому это тонкие обёртки над синхронными версиями
+
+async def set_user_state(user_id: int, state: str):
+    """Устанавливает состояние пользователя"""
+    set_state(user_id, state)
+
+
+async def get_user_state(user_id: int) -> str:
+    """Получает текущее состояние пользователя"""
+    return get_state(user_id)
+
+
+async def clear_user_state(user_id: int):
+    """Очищает состояние пользователя"""
+    clear_state(user_id)
+
+
+async def cleanup_expired_user_states(last_activity: Optional[Mapping[int, float]] = None):
+    """
+    Очищает устаревшие состояния пользователей
+
+    Args:
+        last_activity: Время последнего сообщения по user_id (продлевает состояние)
+    """
+    if last_activity is None:
+        last_activity = {}
+
+    now = time.time()
+
+    # Состояние устаревает, если пользователь неактивен более USER_STATE_TTL
+    # с момента установки состояния и последнего сообщения.
+    # Просматриваются только записи кучи с наступившим сроком: O(k log N)
+    expired_count = 0
+    while _state_expiry and _state_expiry[0][0] <= now:
+        _, user_id = heapq.heappop(_state_expiry)
+        if user_id not in user_states:
+            # Состояние уже очищено или вытеснено
+            _state_set_time.pop(user_id, None)
+            continue
+
+        last_seen = max(_state_set_time.get(user_id, 0), last_activity.get(user_id, 0))
+        expires_at = last_seen + USER_STATE_TTL
+        if expires_at > now:
+            # Пользователь был активен - переносим срок
+            heapq.heappush(_state_expiry, (expires_at, user_id))
+            continue
+
+        del user_states[user_id]
+        _state_set_time.pop(user_id, None)
+        expired_count += 1
+
+    if expired_count:
+        logger.info(f"🧹 Очищено {expired_count} устаревших состояний пользователей")